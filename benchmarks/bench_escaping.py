@@ -0,0 +1,104 @@
+"""
+Trošak escapiranja jednog tekstualnog polja: prije i poslije.
+
+"prije" je dosadašnji put (deset str.replace poziva u replace_croatian_chars,
+pa escape_xml_text koji još jednom escapira '&' iz &#x...;), "poslije" je
+escape_xml_field (escape_xml_text pa zamjena samo onih dijakritičkih
+znakova koji se pojavljuju u tekstu; ASCII tekst se ne pretražuje). Za svaki
+uzorak provjerava se da oba puta daju isti tekst u legacy modu.
+
+Primjer:
+    python benchmarks/bench_escaping.py
+    python benchmarks/bench_escaping.py --number 500000
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exporter import escape_xml_text, escape_xml_field, make_text_char_refs
+
+# Tipične vrijednosti polja felhasznalo / dokumentumszam / fiz_mod / vevo_kod / vevo_utlevel_id
+SAMPLES = (
+    'G',
+    'AB1234567',
+    'Ivan Horvat',
+    'Ivan Čačić & Co',
+    'Đurđica Šimić-Žužić, Zagrebačka 12',
+    'BIH 0123456 <pasoš>',
+)
+
+
+def legacy_replace_croatian_chars(text):
+    """replace_croatian_chars prije optimizacije (za usporedbu)."""
+    if not text:
+        return ''
+    
+    text = str(text)
+    
+    replacements = {
+        'Č': '&#x010C;',
+        'č': '&#x010D;',
+        'Ć': '&#x0106;',
+        'ć': '&#x0107;',
+        'Š': '&#x0160;',
+        'š': '&#x0161;',
+        'Ž': '&#x017D;',
+        'ž': '&#x017E;',
+        'Đ': '&#x0110;',
+        'đ': '&#x0111;',
+    }
+    
+    for char, code in replacements.items():
+        text = text.replace(char, code)
+    
+    return text
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Trošak escapiranja tekstualnog polja prije i poslije.")
+    parser.add_argument('--number', type=int, default=200000,
+                        help="broj poziva po mjerenju (default 200000)")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="broj mjerenja, uzima se najbrže (default 5)")
+    return parser.parse_args(argv)
+
+
+def measure(func, text, number, repeat):
+    """Vraća najbrže vrijeme jednog poziva u nanosekundama."""
+    return min(timeit.repeat(lambda: func(text), number=number, repeat=repeat)) / number * 1e9
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    char_refs = make_text_char_refs('legacy')
+    
+    def before(text):
+        return escape_xml_text(legacy_replace_croatian_chars(text))
+    
+    def after(text):
+        return escape_xml_field(text, char_refs)
+    
+    print(f"{'uzorak':<38} {'prije ns':>10} {'poslije ns':>11} {'ubrzanje':>9}")
+    total_before = total_after = 0.0
+    for text in SAMPLES:
+        if before(text) != after(text):
+            print(f"Greška: različit izlaz za {text!r}", file=sys.stderr)
+            return 1
+        
+        before_ns = measure(before, text, args.number, args.repeat)
+        after_ns = measure(after, text, args.number, args.repeat)
+        total_before += before_ns
+        total_after += after_ns
+        print(f"{text!r:<38} {before_ns:>10.0f} {after_ns:>11.0f} {before_ns / after_ns:>8.1f}x")
+    
+    print(f"{'prosjek':<38} {total_before / len(SAMPLES):>10.0f} {total_after / len(SAMPLES):>11.0f} "
+          f"{total_before / total_after:>8.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Benchmark cijelog exporta na sintetičkoj zamjenskoj bazi (bez Firebirda).
+
+Gradi zamjensku bazu (standin_db.py) zadane veličine i mjeri faze:
+    baza    - generiranje zamjenske baze
+    dohvat  - samo čitanje (iter_day_data), bez XML-a
+    export  - generate_xml kroz [EXPORT] source=mirror
+    export wN - isto s --workers paralelnih konekcija (ako je --workers > 1)
+Za svaku fazu ispisuje slogova u sekundi, broj SQL upita, vršnu RSS memoriju
+i izlazne bajtove. Svaka faza se izvodi u zasebnom procesu, pa je vršna RSS
+memorija baš ta faza (na Windowsima samo ako je instaliran psutil).
+
+Primjer:
+    python benchmarks/bench_export.py
+    python benchmarks/bench_export.py --days 90 --currencies 20 --per-day 5000 --workers 4
+    python benchmarks/bench_export.py --db bench.sqlite --keep
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import exporter
+from standin_db import STANDIN_VALTO_NBR, build_standin, configure_standin
+
+START_DATE = date(2026, 1, 1)
+
+
+def peak_rss():
+    """Vraća vršnu RSS memoriju procesa u bajtovima ili None ako se ne može izmjeriti."""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return getattr(psutil.Process().memory_info(), 'peak_wset', None)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def query_count():
+    stats = exporter.get_statement_cache_stats()
+    return stats['hits'] + stats['misses']
+
+
+def phase_build(db_path, days, currencies, per_day, workers, output_dir):
+    counts = build_standin(db_path, START_DATE, days, currencies, per_day)
+    return counts['rows'], counts['statements'], os.path.getsize(db_path)
+
+
+def phase_read(db_path, days, currencies, per_day, workers, output_dir):
+    configure_standin(db_path)
+    end_date = START_DATE + timedelta(days=days - 1)
+    try:
+        idblag_index = exporter.get_idblag_index(START_DATE.isoformat(), end_date.isoformat())
+        rows = 0
+        for datum, stanje_rows, transactions in exporter.iter_day_data(idblag_index):
+            rows += len(stanje_rows) + len(transactions)
+        return rows, query_count(), 0
+    finally:
+        exporter.close_database_connection()
+
+
+def phase_export(db_path, days, currencies, per_day, workers, output_dir):
+    configure_standin(db_path, workers=workers)
+    end_date = START_DATE + timedelta(days=days - 1)
+    last = {}
+    try:
+        filename = exporter.generate_xml(
+            STANDIN_VALTO_NBR, START_DATE, end_date,
+            progress=last.update,
+            output_dir=output_dir,
+            incremental=False
+        )
+        return last.get('rows_written', 0), query_count(), os.path.getsize(os.path.join(output_dir, filename))
+    finally:
+        exporter.close_database_connection()
+
+
+def run_phase(phase, *args):
+    """Izvodi fazu i vraća (sekunde, slogova, upita, bajtova, vršna RSS)."""
+    started = time.perf_counter()
+    rows, queries, size = phase(*args)
+    return time.perf_counter() - started, rows, queries, size, peak_rss()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark exporta na sintetičkoj zamjenskoj bazi.")
+    parser.add_argument('--days', type=int, default=30,
+                        help="broj dana (default 30)")
+    parser.add_argument('--currencies', type=int, default=10,
+                        help="broj valuta (default 10)")
+    parser.add_argument('--per-day', type=int, default=2000,
+                        help="transakcija po danu (default 2000)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="dodatno mjeri export s ovoliko paralelnih konekcija (default 1)")
+    parser.add_argument('--db', default=None,
+                        help="putanja zamjenske baze (default privremena datoteka)")
+    parser.add_argument('--keep', action='store_true',
+                        help="ne briši zamjensku bazu i XML nakon mjerenja")
+    return parser.parse_args(argv)
+
+
+def format_bytes(value):
+    return '-' if value is None else f'{value / 1024 / 1024:.1f}'
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    
+    work_dir = tempfile.mkdtemp(prefix='bench_export_')
+    db_path = args.db or os.path.join(work_dir, 'standin.sqlite')
+    
+    phases = [
+        ('baza', phase_build, 1),
+        ('dohvat', phase_read, 1),
+        ('export', phase_export, 1),
+    ]
+    if args.workers > 1:
+        phases.append((f'export w{args.workers}', phase_export, args.workers))
+    
+    # Svaka faza u svježem procesu (spawn i na Linuxu), da ru_maxrss ne
+    # uključuje prethodne faze
+    context = multiprocessing.get_context('spawn')
+    results = []
+    try:
+        for name, phase, workers in phases:
+            with context.Pool(1) as pool:
+                result = pool.apply(run_phase, (
+                    phase, db_path, args.days, args.currencies, args.per_day, workers, work_dir
+                ))
+            results.append((name,) + result)
+            print(f"{name}: {result[0]:.2f} s", file=sys.stderr)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            if args.db:
+                for suffix in ('', '-wal', '-shm'):
+                    if os.path.exists(args.db + suffix):
+                        os.remove(args.db + suffix)
+    
+    print(f"{args.days} dana x {args.currencies} valuta x {args.per_day} transakcija/dan")
+    print(f"{'faza':<12} {'sekundi':>9} {'slogova':>10} {'slogova/s':>11} {'upita':>7} {'vršni RSS MB':>13} {'izlaz MB':>9}")
+    for name, seconds, rows, queries, size, rss in results:
+        print(
+            f"{name:<12} {seconds:>9.2f} {rows:>10} {rows / seconds:>11.0f} {queries:>7} "
+            f"{format_bytes(rss):>13} {format_bytes(size):>9}"
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
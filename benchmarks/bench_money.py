@@ -0,0 +1,100 @@
+"""
+Iznosi s 2 decimale: float, money=fixed i izravni decimal.Decimal.
+
+Za --count slučajnih iznosa i tečajeva (Decimal, kako ih vraća fdb za
+NUMERIC stupce) mjeri trošak formatiranja iznosa (valto_nyito, ertek) i
+umnoška iznos * tečaj (valto_nyito_km) za tri puta:
+    float   - f"{float(x):.2f}" (dosadašnji ispis, [EXPORT] money=float)
+    fixed   - to_decimal / format_money ([EXPORT] money=fixed)
+    decimal - Decimal.quantize(ROUND_HALF_UP) bez pamćenja tečajeva
+i broji koliko rezultata odstupa od točnog half-up zaokruživanja.
+
+Primjer:
+    python benchmarks/bench_money.py
+    python benchmarks/bench_money.py --count 500000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exporter import (
+    fixed_amount_text,
+    fixed_product_text,
+    float_amount_text,
+    float_product_text,
+)
+
+CENT = Decimal('0.01')
+
+
+def decimal_amount_text(value):
+    return str(value.quantize(CENT, ROUND_HALF_UP))
+
+
+def decimal_product_text(amount, rate):
+    return str((amount * Decimal(repr(rate))).quantize(CENT, ROUND_HALF_UP))
+
+
+def make_values(count, seed=1):
+    """
+    Vraća (iznosi, tečajevi). Iznosi imaju 2-3 decimale (dio završava na 5,
+    gdje float i half-up najčešće razilaze), tečajevi 6 decimala kao float
+    (kako ih vraća RateIndex), iz skupa od 300 tečajeva (10 valuta x 30 dana).
+    """
+    rnd = random.Random(seed)
+    rate_pool = [float(Decimal(rnd.randint(10 ** 5, 10 ** 7)).scaleb(-6)) for _ in range(300)]
+    amounts = [Decimal(rnd.randint(1, 10 ** 8)).scaleb(-rnd.choice((2, 2, 3))) for _ in range(count)]
+    rates = [rnd.choice(rate_pool) for _ in range(count)]
+    return amounts, rates
+
+
+def timed(func, *columns):
+    """Vraća (nanosekunde po pozivu, rezultati)."""
+    started = time.perf_counter()
+    results = [func(*args) for args in zip(*columns)]
+    return (time.perf_counter() - started) / len(results) * 1e9, results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Trošak i točnost formatiranja iznosa: float, fixed, Decimal.")
+    parser.add_argument('--count', type=int, default=200000,
+                        help="broj iznosa (default 200000)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    amounts, rates = make_values(args.count)
+    
+    paths = (
+        ('float', float_amount_text, float_product_text),
+        ('fixed', fixed_amount_text, fixed_product_text),
+        ('decimal', decimal_amount_text, decimal_product_text),
+    )
+    
+    measured = []
+    for name, amount_text, product_text in paths:
+        amount_ns, amount_results = timed(amount_text, amounts)
+        product_ns, product_results = timed(product_text, amounts, rates)
+        measured.append((name, amount_ns, product_ns, amount_results, product_results))
+    
+    # Decimal s ROUND_HALF_UP je referenca za točnost
+    exact_amounts, exact_products = measured[-1][3], measured[-1][4]
+    
+    print(f"{'put':<8} {'iznos ns':>9} {'umnožak ns':>11} {'odstupanja iznos':>17} {'odstupanja umnožak':>19}")
+    for name, amount_ns, product_ns, amount_results, product_results in measured:
+        amount_diff = sum(1 for a, b in zip(amount_results, exact_amounts) if a != b)
+        product_diff = sum(1 for a, b in zip(product_results, exact_products) if a != b)
+        print(f"{name:<8} {amount_ns:>9.0f} {product_ns:>11.0f} {amount_diff:>17} {product_diff:>19}")
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Usporedba izlaznih formata: veličina datoteke i trajanje slanja po modu.
+
+Za isti raspon datuma generira XML u svakom modu (indented / compact,
+none / gzip / zip) i ispisuje broj bajtova, vrijeme generiranja te vrijeme
+slanja. Bez --upload vrijeme slanja se procjenjuje iz --link-kbps (brzina
+uploada poslovnice), s --upload se datoteka stvarno šalje na FTP iz REPORT.INI.
+
+Primjer:
+    python benchmarks/bench_output_modes.py --start 2026-02-01 --end 2026-02-28
+    python benchmarks/bench_output_modes.py --start 2026-02-01 --end 2026-02-28 --link-kbps 512
+    python benchmarks/bench_output_modes.py --start 2026-02-01 --end 2026-02-28 --upload
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import exporter
+from cli import parse_cli_date
+from config import load_config, ConfigError, OUTPUT_FORMATS, COMPRESSIONS
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Veličina i trajanje slanja XML-a po izlaznom modu.")
+    parser.add_argument('--start', required=True, type=parse_cli_date,
+                        help="početni datum (YYYY-MM-DD)")
+    parser.add_argument('--end', required=True, type=parse_cli_date,
+                        help="završni datum (YYYY-MM-DD)")
+    parser.add_argument('--ini', default=None,
+                        help="putanja do REPORT.INI (default: folder aplikacije)")
+    parser.add_argument('--link-kbps', type=float, default=1024.0,
+                        help="brzina uploada za procjenu, kbit/s (default 1024)")
+    parser.add_argument('--upload', action='store_true',
+                        help="stvarno pošalji svaku datoteku na FTP i izmjeri vrijeme")
+    return parser.parse_args(argv)
+
+
+def remove_remote(filename):
+    """Briše probnu datoteku s FTP servera da ne ostane za obradu."""
+    ftp = exporter.open_ftp()
+    try:
+        ftp.delete(filename)
+        ftp.quit()
+    finally:
+        ftp.close()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    
+    try:
+        config = load_config(args.ini)
+    except ConfigError as e:
+        print(f"Greška: {e}", file=sys.stderr)
+        return 1
+    
+    exporter.configure(config)
+    
+    try:
+        exporter.connect_to_database()
+        valto_nbr = exporter.get_uniqueid()
+        if not valto_nbr:
+            print("Greška: UNIQUEID nije pronađen u tablici FIRME", file=sys.stderr)
+            return 1
+        
+        output_dir = tempfile.mkdtemp(prefix='bench_output_modes_')
+        results = []
+        
+        for output_format in OUTPUT_FORMATS:
+            for compression in COMPRESSIONS:
+                started = time.perf_counter()
+                filename = exporter.generate_xml(
+                    valto_nbr, args.start, args.end,
+                    output_dir=output_dir,
+                    output_format=output_format,
+                    compression=compression
+                )
+                generate_seconds = time.perf_counter() - started
+                
+                filepath = os.path.join(output_dir, filename)
+                size = os.path.getsize(filepath)
+                
+                if args.upload:
+                    started = time.perf_counter()
+                    exporter.upload_to_ftp(filename, output_dir=output_dir)
+                    upload_seconds = time.perf_counter() - started
+                    remove_remote(filename)
+                else:
+                    upload_seconds = size * 8 / (args.link_kbps * 1000)
+                
+                os.remove(filepath)
+                results.append((output_format, compression, size, generate_seconds, upload_seconds))
+        
+        os.rmdir(output_dir)
+    
+    except Exception as e:
+        print(f"Greška: {e}", file=sys.stderr)
+        return 1
+    
+    finally:
+        exporter.close_database_connection()
+    
+    baseline = results[0][2]
+    upload_label = "upload s" if args.upload else f"upload s (@{args.link_kbps:g} kbit/s)"
+    
+    print(f"{'format':<10} {'kompresija':<10} {'bajtova':>12} {'%':>6} {'generiranje s':>14} {upload_label:>24}")
+    for output_format, compression, size, generate_seconds, upload_seconds in results:
+        print(
+            f"{output_format:<10} {compression:<10} {size:>12} {size / baseline * 100:>5.1f}% "
+            f"{generate_seconds:>14.2f} {upload_seconds:>24.2f}"
+        )
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
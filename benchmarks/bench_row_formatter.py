@@ -0,0 +1,149 @@
+"""
+Brzina formatiranja stavki kozonseges_tetel: generički i prevedeni formatter.
+
+Generira --rows sintetičkih transakcija (Transaction, po --per-day u danu) i
+zapisuje ih kroz XmlStreamWriter na oba načina:
+    generic  - kozonseges_fields() + write_group (lista (tag, tekst) parova)
+    compiled - compile_kozonseges_formatter() + write_rendered_group
+Ispisuje slogova u sekundi i provjerava da je izlaz bajt-identičan (SHA-256).
+Baza nije potrebna.
+
+Primjer:
+    python benchmarks/bench_row_formatter.py
+    python benchmarks/bench_row_formatter.py --rows 1000000 --output-format compact
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exporter import (
+    Transaction,
+    XmlStreamWriter,
+    compile_kozonseges_formatter,
+    kozonseges_fields,
+)
+from config import OUTPUT_FORMATS
+
+VALUTE = ('036', '124', '191', '203', '208', '348', '756', '826', '840', '978')
+KORISNICI = ('Ana Kovač', 'Ivan Horvat', 'Marko Šimić', 'Đurđa Žužić', 'Petra Babić')
+
+
+class HashSink:
+    """File-like objekt koji samo računa SHA-256 i broj bajtova."""
+    
+    def __init__(self):
+        self.sha = hashlib.sha256()
+        self.size = 0
+    
+    def write(self, data):
+        self.sha.update(data)
+        self.size += len(data)
+
+
+def make_days(rows, per_day, seed=1):
+    """
+    Vraća listu (datum, transakcije, tečajevi) sa sintetičkim podacima.
+    Tečajevi su {valuta: float}, kao što ih vraća RateIndex.lookup.
+    """
+    rnd = random.Random(seed)
+    days = []
+    day = date(2026, 1, 1)
+    id_bt = 0
+    while rows > 0:
+        count = min(per_day, rows)
+        rates = {valuta: round(rnd.uniform(0.1, 9.0), 6) for valuta in VALUTE}
+        transactions = []
+        for i in range(count):
+            id_bt += 1
+            valuta = rnd.choice(VALUTE)
+            transactions.append(Transaction(
+                datetime(day.year, day.month, day.day),
+                valuta,
+                Decimal(rnd.randint(1, 500000)) / 100,
+                Decimal(rnd.randint(1, 5000000)) / 100,
+                datetime(day.year, day.month, day.day, 8) + timedelta(seconds=i * 7),
+                f'{id_bt:010d}',
+                f'AB{rnd.randint(0, 9999999):07d}',
+                rnd.choice(('G', 'K', '')),
+                Decimal(rates[valuta]).quantize(Decimal('0.000001')),
+                rnd.choice(('Ivan Horvat', 'Ana & Co', '', 'Mirela Čačić')),
+                rnd.choice(('HR1234567', 'BIH7654321', '')),
+                rnd.choice((Decimal('0.50'), Decimal('1.00'), None)),
+                rnd.choice(KORISNICI),
+                101,
+                id_bt,
+            ))
+        days.append((day, transactions, rates))
+        day += timedelta(days=1)
+        rows -= count
+    return days
+
+
+def run(days, valto_nbr, indent, compiled):
+    """Zapisuje sve dane; vraća (sekunde, HashSink)."""
+    sink = HashSink()
+    writer = XmlStreamWriter(sink, indent=indent)
+    valto_text = str(valto_nbr)
+    format_row = compile_kozonseges_formatter(writer, valto_nbr) if compiled else None
+    
+    started = time.perf_counter()
+    for day, transactions, rates in days:
+        items = []
+        for nbr, t in enumerate(transactions, start=1):
+            if format_row is not None:
+                items.append(format_row(t, nbr, rates[t.valuta]))
+            else:
+                items.append(kozonseges_fields(t, nbr, valto_text, rates[t.valuta]))
+        if format_row is not None:
+            writer.write_rendered_group('kozonseges_tetelek', items)
+        else:
+            writer.write_group('kozonseges_tetelek', 'kozonseges_tetel', items)
+    writer.close()
+    return time.perf_counter() - started, sink
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Brzina generičkog i prevedenog formattera stavki.")
+    parser.add_argument('--rows', type=int, default=1000000,
+                        help="broj transakcija (default 1000000)")
+    parser.add_argument('--per-day', type=int, default=2000,
+                        help="transakcija po danu (default 2000)")
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default='indented',
+                        help="izlazni format (default indented)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    indent = '  ' if args.output_format == 'indented' else None
+    
+    print(f"Generiram {args.rows} transakcija...", file=sys.stderr)
+    days = make_days(args.rows, args.per_day)
+    
+    generic_seconds, generic_sink = run(days, '009', indent, compiled=False)
+    compiled_seconds, compiled_sink = run(days, '009', indent, compiled=True)
+    
+    if generic_sink.sha.digest() != compiled_sink.sha.digest():
+        print("Greška: prevedeni formatter ne daje isti XML kao generički", file=sys.stderr)
+        return 1
+    
+    print(f"{'formatter':<10} {'sekundi':>9} {'slogova/s':>12} {'MB':>8}")
+    for name, seconds, sink in (
+        ('generic', generic_seconds, generic_sink),
+        ('compiled', compiled_seconds, compiled_sink),
+    ):
+        print(f"{name:<10} {seconds:>9.2f} {args.rows / seconds:>12.0f} {sink.size / 1024 / 1024:>8.1f}")
+    print(f"\nubrzanje: {generic_seconds / compiled_seconds:.1f}x (izlaz identičan)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Memorija i trajanje po slogu transakcije: dictionary (prije) i Transaction
+namedtuple (poslije).
+
+Za --rows slogova u obliku koji vraća fetchmany (tuple s Decimal, datetime i
+str vrijednostima) gradi oba modela i mjeri:
+    - bajtove po slogu (tracemalloc, samo objekti modela - vrijednosti su
+      zajedničke i ne broje se)
+    - vrijeme pretvaranja tuple -> slog
+    - vrijeme čitanja polja koja čita write_xml
+
+Primjer:
+    python benchmarks/bench_row_model.py
+    python benchmarks/bench_row_model.py --rows 500000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exporter import Transaction
+
+def dict_from_row(row):
+    """_transaction_from_row prije prelaska na Transaction (za usporedbu)."""
+    return {
+        'datum_tecajne_liste': row[0],
+        'valuta': row[1],
+        'iznos_valuta': row[2],
+        'iznos_kune': row[3],
+        'datum_vrijeme': row[4],
+        'serijski_broj': row[5],
+        'br_kartice': row[6],
+        'oznaka_platnog': row[7],
+        'primjenjeni_tecaj': row[8],
+        'prodaoime': row[9],
+        'prodaodok': row[10],
+        'provbanke': row[11] if row[11] else 0,
+        'korisnik_ime': row[12],
+        'idblag': row[13],
+        'id_bt': row[14]
+    }
+
+
+def make_rows(count):
+    """Slogovi kakve vraća fetchmany; vrijednosti se dijele među slogovima."""
+    datum = datetime(2026, 2, 1)
+    vrijeme = datetime(2026, 2, 1, 10, 15, 30)
+    return [
+        (datum, '978', Decimal('100.00'), Decimal('753.45'), vrijeme, 'A123', 'AB1234567',
+         'G', Decimal('7.534500'), 'Ivan Horvat', 'HR1234567', Decimal('0.50'), 'Ana', 101, i)
+        for i in range(count)
+    ]
+
+
+def measure_memory(convert, rows):
+    """Vraća bajtove po slogu za listu slogova modela."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    converted = [convert(row) for row in rows]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(converted)
+
+
+def measure_build(convert, rows):
+    """Vraća nanosekunde po slogu za pretvaranje tuple -> slog."""
+    started = time.perf_counter()
+    for row in rows:
+        convert(row)
+    return (time.perf_counter() - started) / len(rows) * 1e9
+
+
+def measure_read(records, read):
+    """Vraća nanosekunde po slogu za čitanje polja koja čita write_xml."""
+    started = time.perf_counter()
+    for record in records:
+        read(record)
+    return (time.perf_counter() - started) / len(records) * 1e9
+
+
+def read_dict(t):
+    return (t['datum_vrijeme'], t['valuta'], t['korisnik_ime'], t['serijski_broj'], t['br_kartice'],
+            t['oznaka_platnog'], t['iznos_valuta'], t['primjenjeni_tecaj'], t['provbanke'],
+            t['prodaoime'], t['prodaodok'])
+
+
+def read_tuple(t):
+    return (t.datum_vrijeme, t.valuta, t.korisnik_ime, t.serijski_broj, t.br_kartice,
+            t.oznaka_platnog, t.iznos_valuta, t.primjenjeni_tecaj, t.provbanke,
+            t.prodaoime, t.prodaodok)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Memorija i trajanje po slogu: dictionary i namedtuple.")
+    parser.add_argument('--rows', type=int, default=200000,
+                        help="broj slogova (default 200000)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rows = make_rows(args.rows)
+    
+    results = []
+    for name, convert, read in (
+        ('dictionary', dict_from_row, read_dict),
+        ('Transaction', Transaction._make, read_tuple),
+    ):
+        memory = measure_memory(convert, rows)
+        build_ns = measure_build(convert, rows)
+        records = [convert(row) for row in rows]
+        read_ns = measure_read(records, read)
+        results.append((name, memory, build_ns, read_ns))
+    
+    print(f"{'model':<12} {'B/slog':>8} {'izgradnja ns':>13} {'čitanje ns':>11}")
+    for name, memory, build_ns, read_ns in results:
+        print(f"{name:<12} {memory:>8.0f} {build_ns:>13.0f} {read_ns:>11.0f}")
+    
+    print(f"\n{args.rows} slogova: {results[0][1] * args.rows / 1024 / 1024:.1f} MB -> "
+          f"{results[1][1] * args.rows / 1024 / 1024:.1f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,290 @@
+"""
+Provjera da optimizirani putovi exporta daju isti XML kao referentna
+implementacija (golden_reference.py - generate_xml iz prve verzije app.py).
+
+Na istim podacima pokreće referencu i svaki put exporta:
+    generate          - generate_xml (prevedeni formatter, jedna konekcija)
+    generic           - [EXPORT] row_formatter=generic
+    parallel          - [EXPORT] workers=3, shard_days=2
+    parallel generic  - oboje
+    stream            - write_xml u BoundedPipe (kao export_and_send, bez FTP-a)
+    gzip / zip        - komprimirani izlaz, uspoređuje se raspakirani XML
+    compact           - [EXPORT] output_format=compact, uspoređuje se
+                        kanonizirani XML (C14N bez razmaka između elemenata)
+    rate cache        - [EXPORT] rate_cache_file: prvi export dok tečajna lista
+                        postoji samo za prvu polovicu raspona, pa nakon dodanih
+                        tečajeva drugi export mora ih pročitati iz baze
+Svi osim compact moraju biti bajt-identični referenci. Kod razlike ispisuje
+prvi različit redak; exit code je 1 ako se bilo koji put razlikuje.
+
+Bez --db podaci su sintetička zamjenska baza (standin_db.py) s dodanim
+rubnim slučajevima: dan bez BLAGAJNA sloga, dan bez transakcija i dan bez
+stanja, valuta bez VALUTE sloga i tečaja, nulti tečaj, NULL vrijednosti,
+iznosi na pola centa, '&' / '<' i dijakritički znakovi. S --db se koristi
+postojeća SQLite datoteka u formatu mirrora (npr. kopija produkcijskog
+mirrora nakon cli.py --sync-mirror).
+
+[EXPORT] text_escaping=charref/utf8 i money=fixed namjerno mijenjaju izlaz,
+pa se ovdje ne provjeravaju.
+
+Primjer:
+    python benchmarks/check_golden.py
+    python benchmarks/check_golden.py --db C:/XML/mirror_kopija.sqlite --start 2026-01-01 --end 2026-01-31
+"""
+
+import argparse
+import gzip
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import exporter
+from cli import parse_cli_date
+from golden_reference import generate_reference_xml, get_uniqueid
+from mirror import open_mirror_connection
+from standin_db import build_standin, configure_standin
+
+FIXTURE_START = date(2026, 1, 1)
+FIXTURE_DAYS = 21
+
+
+def add_edge_cases(path, start_date):
+    """
+    Dodaje rubne slučajeve u zamjensku bazu (IDBLAG dana je redni broj dana
+    od start_date, počevši od 1 - vidi build_standin).
+    """
+    day = lambda n: start_date + timedelta(days=n - 1)
+    
+    con = open_mirror_connection(path)
+    try:
+        # Dan bez BLAGAJNA sloga se preskače
+        for table in ('BLAGAJNICKE_TRANSAKCIJE', 'BLAGAJNA_STANJE', 'BLAGAJNA'):
+            con.execute(f'DELETE FROM {table} WHERE IDBLAG = 3')
+        
+        # Dan samo sa stanjem i dan samo s transakcijama
+        con.execute('DELETE FROM BLAGAJNICKE_TRANSAKCIJE WHERE IDBLAG = 4')
+        con.execute('DELETE FROM BLAGAJNA_STANJE WHERE IDBLAG = 5')
+        
+        # Valuta bez VALUTE sloga i tečaja; stanje na pola centa
+        con.execute('INSERT INTO BLAGAJNA_STANJE VALUES (?, ?, ?)', (1, '999', Decimal('1.125')))
+        con.execute('INSERT INTO BLAGAJNA_STANJE VALUES (?, ?, ?)', (1, '998', Decimal('0.00')))
+        
+        # Nulti tečaj se tretira kao nepostojeći (1.0)
+        code = con.execute('SELECT MIN(VALUTA_BROJCANO) FROM VALUTE').fetchone()[0]
+        con.execute(
+            "UPDATE TECAJEVI SET KUPOVNI_TECAJ = ? WHERE TL_DATUM_TECAJNE_LISTE = ? AND VALUTA_BROJCANO = ?",
+            (Decimal('0.000000'), day(2), code)
+        )
+        
+        # Transakcije s NULL vrijednostima, nepostojećim korisnikom i valutom
+        timestamp = datetime(day(2).year, day(2).month, day(2).day, 12)
+        # (valuta, iznos, tečaj, serijski, kartica, platni, kupac, dokument, korisnik)
+        rows = [
+            (None, None, None, None, None, None, None, None, None),
+            ('999', Decimal('0'), None, '  ', 'x>y & z', None, 'bih 123', 'bih 123', 9999),
+            (code, Decimal('0.125'), Decimal('7.500000'), '0000000001', 'Šš<Đđ>', 'K', 'Ćiro & Žac', 'ĐŽ1', 1),
+            (code, Decimal('2.675'), Decimal('1.000000'), '0000000002', '', '', 'BIH', 'xbihx', 2),
+            (code, Decimal('1000000.005'), Decimal('0.000001'), '0000000003', 'Č', 'G', 'HR-č', '', 3),
+        ]
+        con.executemany(
+            '''INSERT INTO BLAGAJNICKE_TRANSAKCIJE (
+                ID_BT, IDBLAG, TEC_TL_DATUM_TECAJNE_LISTE, TEC_VALUTA_BROJCANO,
+                IZNOS_U_VALUTI, IZNOS_U_KUNAMA, DATUM_I_VRIJEME_TRANSAKCIJE, SERIJSKI_BROJ,
+                BR_KARTICE, OZNAKA_PLATNOG_INSTRUMENTA_U_K, PRIMJENJENI_TECAJ,
+                PRODAOIME, PRODAODOK, VTR_VRSTA_TRANSAKCIJE, SISUSER
+            ) VALUES (?, 2, ?, ?, ?, NULL, ?, ?, ?, ?, ?, ?, ?, 'FG', ?)''',
+            [(10 ** 9 + i, timestamp, row[0], row[1], timestamp) + row[3:6] + (row[2],) + row[6:]
+             for i, row in enumerate(rows)]
+        )
+        con.commit()
+    finally:
+        con.close()
+
+
+def read_output(output_dir, filename):
+    """Vraća nekomprimirani XML iz datoteke koju je napisao generate_xml."""
+    with open(os.path.join(output_dir, filename), 'rb') as f:
+        data = f.read()
+    if filename.endswith('.gz'):
+        return gzip.decompress(data)
+    if filename.endswith('.zip'):
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            return archive.read(archive.namelist()[0])
+    return data
+
+
+def run_file(valto_nbr, start_date, end_date, output_dir):
+    filename = exporter.generate_xml(valto_nbr, start_date, end_date, output_dir=output_dir, incremental=False)
+    try:
+        return read_output(output_dir, filename)
+    finally:
+        os.remove(os.path.join(output_dir, filename))
+
+
+def run_stream(valto_nbr, start_date, end_date, output_dir):
+    """write_xml u BoundedPipe; druga nit čita kao ftplib.storbinary."""
+    pipe = exporter.BoundedPipe(max_bytes=64 * 1024)
+    chunks = []
+    
+    def consume():
+        while True:
+            data = pipe.read(8192)
+            if not data:
+                break
+            chunks.append(data)
+    
+    reader = threading.Thread(target=consume, daemon=True)
+    reader.start()
+    try:
+        exporter.write_xml(pipe, valto_nbr, start_date, end_date)
+    except BaseException as e:
+        pipe.abort(e)
+        raise
+    pipe.close()
+    reader.join()
+    return b''.join(chunks)
+
+
+def run_rate_cache(valto_nbr, start_date, end_date, output_dir):
+    """
+    Export s [EXPORT] rate_cache_file nakon exporta u kojem tečajevi za drugu
+    polovicu raspona još nisu postojali. Radi na kopiji baze.
+    """
+    db_copy = os.path.join(output_dir, 'rate_cache.sqlite')
+    shutil.copy(exporter.EXPORT_CONFIG['mirror_path'], db_copy)
+    cutoff = start_date + (end_date - start_date) / 2
+    
+    con = open_mirror_connection(db_copy)
+    try:
+        late_rates = con.execute(
+            'SELECT * FROM TECAJEVI WHERE TL_DATUM_TECAJNE_LISTE > ?', (cutoff,)
+        ).fetchall()
+        con.execute('DELETE FROM TECAJEVI WHERE TL_DATUM_TECAJNE_LISTE > ?', (cutoff,))
+        con.commit()
+        
+        exporter.EXPORT_CONFIG['mirror_path'] = db_copy
+        exporter.EXPORT_CONFIG['rate_cache_file'] = os.path.join(output_dir, 'rate_cache.json')
+        try:
+            run_file(valto_nbr, start_date, end_date, output_dir)
+        finally:
+            exporter.close_database_connection()
+        
+        con.executemany('INSERT INTO TECAJEVI VALUES (?, ?, ?, ?)', late_rates)
+        con.commit()
+    finally:
+        con.close()
+    
+    return run_file(valto_nbr, start_date, end_date, output_dir)
+
+
+# (naziv, funkcija, [EXPORT] vrijednosti, usporedba)
+ENGINES = (
+    ('generate', run_file, {}, 'bytes'),
+    ('generic', run_file, {'row_formatter': 'generic'}, 'bytes'),
+    ('parallel', run_file, {'workers': 3, 'shard_days': 2}, 'bytes'),
+    ('parallel generic', run_file, {'workers': 3, 'shard_days': 2, 'row_formatter': 'generic'}, 'bytes'),
+    ('stream', run_stream, {}, 'bytes'),
+    ('gzip', run_file, {'compression': 'gzip'}, 'bytes'),
+    ('zip', run_file, {'compression': 'zip'}, 'bytes'),
+    ('compact', run_file, {'output_format': 'compact'}, 'canonical'),
+    ('rate cache', run_rate_cache, {}, 'bytes'),
+)
+
+
+def canonical(data):
+    """C14N oblik XML-a bez razmaka između elemenata."""
+    return ET.canonicalize(data.decode('utf-8'), strip_text=True).encode('utf-8')
+
+
+def first_difference(expected, actual):
+    """Vraća opis prvog različitog retka ili None ako su jednaki."""
+    if expected == actual:
+        return None
+    expected_lines = expected.split(b'\n')
+    actual_lines = actual.split(b'\n')
+    for number, (a, b) in enumerate(zip(expected_lines, actual_lines), start=1):
+        if a != b:
+            return f"redak {number}:\n    referenca: {a[:200]!r}\n    put:       {b[:200]!r}"
+    return f"različit broj redaka: referenca {len(expected_lines)}, put {len(actual_lines)}"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Usporedba putova exporta s referentnom implementacijom.")
+    parser.add_argument('--db', default=None,
+                        help="postojeća SQLite baza u formatu mirrora (default sintetička s rubnim slučajevima)")
+    parser.add_argument('--start', type=parse_cli_date, default=None,
+                        help="početni datum (YYYY-MM-DD), obavezan uz --db")
+    parser.add_argument('--end', type=parse_cli_date, default=None,
+                        help="završni datum (YYYY-MM-DD), obavezan uz --db")
+    args = parser.parse_args(argv)
+    if args.db and (args.start is None or args.end is None):
+        parser.error("uz --db su obavezni --start i --end")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    work_dir = tempfile.mkdtemp(prefix='check_golden_')
+    
+    try:
+        if args.db:
+            db_path, start_date, end_date = args.db, args.start, args.end
+        else:
+            db_path = os.path.join(work_dir, 'fixture.sqlite')
+            start_date = FIXTURE_START
+            end_date = FIXTURE_START + timedelta(days=FIXTURE_DAYS - 1)
+            build_standin(db_path, start_date, FIXTURE_DAYS, currencies=6, per_day=40)
+            add_edge_cases(db_path, start_date)
+        
+        con = open_mirror_connection(db_path)
+        try:
+            valto_nbr = get_uniqueid(con)
+            reference_path = os.path.join(work_dir, 'reference.XML')
+            generate_reference_xml(con, reference_path, valto_nbr, start_date, end_date)
+        finally:
+            con.close()
+        
+        with open(reference_path, 'rb') as f:
+            expected = f.read()
+        print(f"referenca: {len(expected)} B, {expected.count(b'<kozonseges_tetel>')} transakcija")
+        
+        failed = 0
+        for name, run, overrides, comparison in ENGINES:
+            configure_standin(db_path, **overrides)
+            try:
+                actual = run(valto_nbr, start_date, end_date, work_dir)
+            finally:
+                exporter.close_database_connection()
+            
+            if comparison == 'canonical':
+                difference = first_difference(canonical(expected), canonical(actual))
+            else:
+                difference = first_difference(expected, actual)
+            
+            if difference is None:
+                print(f"{name:<18} OK ({comparison})")
+            else:
+                failed += 1
+                print(f"{name:<18} RAZLIKA ({comparison}) - {difference}")
+    
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    if failed:
+        print(f"\n{failed} od {len(ENGINES)} putova se razlikuje od reference", file=sys.stderr)
+        return 1
+    print(f"\nsvi putovi ({len(ENGINES)}) daju isti XML kao referenca")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""
+Referentna implementacija exporta (ElementTree), za provjeru izlaza.
+
+Ovo je generate_xml iz prve verzije app.py, čiji izlaz prihvaća server
+primatelja: dan po dan kroz kalendar, upit po upitu, cijelo stablo u
+memoriji, ET.indent, pa zamjena self-closing tagova u zapisanoj datoteci.
+Izmjene u odnosu na original su samo one potrebne za pokretanje izvan GUI-a:
+    - konekcija se prosljeđuje (bilo koji DB-API, ? parametri umjesto
+      f-string SQL-a; SELECT FIRST se za SQLite prevodi u LIMIT)
+    - datoteka se piše na zadanu putanju umjesto C:/XML/{naziv}
+    - greške se prosljeđuju umjesto messagebox-a
+
+Ne mijenjati zbog optimizacija - check_golden.py uspoređuje nove putove s
+ovim izlazom.
+"""
+
+import os
+import sqlite3
+import sys
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mirror import translate_sql
+
+
+def _execute(con, sql, params=()):
+    cur = con.cursor()
+    cur.execute(translate_sql(sql) if isinstance(con, sqlite3.Connection) else sql, params)
+    return cur
+
+
+def replace_croatian_chars(text):
+    """
+    Zamjenjuje hrvatske dijakritičke znakove s hexadecimalnim kodovima.
+    
+    Parametri:
+        text: string za zamjenu
+    
+    Vraća:
+        string s zamijenjenim znakovima
+    """
+    if not text:
+        return ''
+    
+    text = str(text)
+    
+    replacements = {
+        'Č': '&#x010C;',
+        'č': '&#x010D;',
+        'Ć': '&#x0106;',
+        'ć': '&#x0107;',
+        'Š': '&#x0160;',
+        'š': '&#x0161;',
+        'Ž': '&#x017D;',
+        'ž': '&#x017E;',
+        'Đ': '&#x0110;',
+        'đ': '&#x0111;',
+    }
+    
+    for char, code in replacements.items():
+        text = text.replace(char, code)
+    
+    return text
+
+
+def get_uniqueid(con):
+    row = _execute(con, 'SELECT FIRST 1 UNIQUEID FROM FIRME ORDER BY IDFIRME DESC').fetchone()
+    if row:
+        return row[0]
+    return None
+
+
+def get_idblag_for_date(con, date_str):
+    row = _execute(
+        con, "SELECT IDBLAG FROM BLAGAJNA WHERE TL_DATUM_TECAJNE_LISTE = ?",
+        (datetime.strptime(date_str, '%Y-%m-%d').date(),)
+    ).fetchone()
+    if row:
+        return row[0]
+    return None
+
+
+def get_blagajna_stanje(con, id_blag):
+    sql = '''
+        SELECT
+            bs.VALUTA_BROJCANO,
+            bs.IZNOS,
+            v.PROV_ZA_BANKU
+        FROM BLAGAJNA_STANJE bs
+        LEFT JOIN VALUTE v ON bs.VALUTA_BROJCANO = v.VALUTA_BROJCANO
+        WHERE bs.IDBLAG = ?
+        ORDER BY bs.VALUTA_BROJCANO
+    '''
+    results = []
+    for row in _execute(con, sql, (id_blag,)).fetchall():
+        results.append({
+            'valuta': row[0],
+            'iznos': row[1],
+            'prov_za_banku': row[2] if row[2] else 0
+        })
+    return results
+
+
+def get_kupovni_tecaj(con, date_str, valuta):
+    sql = '''
+        SELECT KUPOVNI_TECAJ
+        FROM TECAJEVI
+        WHERE TL_DATUM_TECAJNE_LISTE = ?
+          AND VMT_VRSTA_TECAJA = 'RED'
+          AND VALUTA_BROJCANO = ?
+    '''
+    row = _execute(con, sql, (datetime.strptime(date_str, '%Y-%m-%d').date(), valuta)).fetchone()
+    if row and row[0]:
+        return float(row[0])
+    return 1.0
+
+
+def get_all_kupovni_tecajevi_for_date(con, date_str):
+    sql = '''
+        SELECT
+            VALUTA_BROJCANO,
+            KUPOVNI_TECAJ
+        FROM TECAJEVI
+        WHERE TL_DATUM_TECAJNE_LISTE = ?
+          AND VMT_VRSTA_TECAJA = 'RED'
+    '''
+    tecajevi = {}
+    for row in _execute(con, sql, (datetime.strptime(date_str, '%Y-%m-%d').date(),)).fetchall():
+        valuta = row[0]
+        tecaj = float(row[1]) if row[1] else 1.0
+        tecajevi[valuta] = tecaj
+    return tecajevi
+
+
+def get_transactions_for_idblag(con, id_blag):
+    sql = '''
+        SELECT
+            bt.TEC_TL_DATUM_TECAJNE_LISTE,
+            bt.TEC_VALUTA_BROJCANO,
+            bt.IZNOS_U_VALUTI,
+            bt.IZNOS_U_KUNAMA,
+            bt.DATUM_I_VRIJEME_TRANSAKCIJE,
+            bt.SERIJSKI_BROJ,
+            bt.BR_KARTICE,
+            bt.OZNAKA_PLATNOG_INSTRUMENTA_U_K,
+            bt.PRIMJENJENI_TECAJ,
+            bt.PRODAOIME,
+            bt.PRODAODOK,
+            v.PROVBANKE,
+            k.IME
+        FROM BLAGAJNICKE_TRANSAKCIJE bt
+        LEFT JOIN VALUTE v ON bt.TEC_VALUTA_BROJCANO = v.VALUTA_BROJCANO
+        LEFT JOIN KORISNICI k ON bt.SISUSER = k.IDKOR
+        WHERE bt.IDBLAG = ?
+        ORDER BY bt.ID_BT
+    '''
+    transactions = []
+    for row in _execute(con, sql, (id_blag,)).fetchall():
+        transactions.append({
+            'datum_tecajne_liste': row[0],
+            'valuta': row[1],
+            'iznos_valuta': row[2],
+            'iznos_kune': row[3],
+            'datum_vrijeme': row[4],
+            'serijski_broj': row[5],
+            'br_kartice': row[6],
+            'oznaka_platnog': row[7],
+            'primjenjeni_tecaj': row[8],
+            'prodaoime': row[9],
+            'prodaodok': row[10],
+            'provbanke': row[11] if row[11] else 0,
+            'korisnik_ime': row[12]
+        })
+    return transactions
+
+
+def generate_reference_xml(con, filepath, valto_nbr, start_date, end_date):
+    """
+    Piše referentni XML za raspon datuma u filepath.
+    
+    Parametri:
+        con: DB-API konekcija (fdb ili SQLite mirror)
+        filepath: putanja izlazne datoteke
+        valto_nbr: string (UNIQUEID iz FIRME)
+        start_date: datetime.date objekt
+        end_date: datetime.date objekt
+    """
+    root = ET.Element('tomeges_adatok')
+    
+    current_date = start_date
+    
+    while current_date <= end_date:
+        d_datum = current_date.strftime('%Y-%m-%d')
+        
+        id_blag = get_idblag_for_date(con, d_datum)
+        
+        if id_blag is None:
+            current_date += timedelta(days=1)
+            continue
+        
+        valto_tetelek = ET.SubElement(root, 'valto_tetelek')
+        
+        for stanje in get_blagajna_stanje(con, id_blag):
+            valuta = stanje['valuta']
+            iznos = stanje['iznos']
+            prov_za_banku = stanje['prov_za_banku']
+            
+            kupovni_tecaj = get_kupovni_tecaj(con, d_datum, valuta)
+            valto_nyito_km = float(iznos) * kupovni_tecaj
+            
+            valto_tetel = ET.SubElement(valto_tetelek, 'valto_tetel')
+            
+            ET.SubElement(valto_tetel, 'valto_datum').text = d_datum
+            ET.SubElement(valto_tetel, 'valto_nbr').text = str(valto_nbr)
+            ET.SubElement(valto_tetel, 'valto_valuta').text = str(valuta) if valuta else ''
+            ET.SubElement(valto_tetel, 'valto_nyito').text = f"{float(iznos):.2f}"
+            ET.SubElement(valto_tetel, 'valto_nyito_km').text = f"{valto_nyito_km:.2f}"
+            ET.SubElement(valto_tetel, 'valto_exc_percent').text = f"{100 - float(prov_za_banku):.2f}"
+            ET.SubElement(valto_tetel, 'valto_bank_percent').text = f"{float(prov_za_banku):.2f}"
+        
+        kozonseges_tetelek = ET.SubElement(root, 'kozonseges_tetelek')
+        
+        transactions = get_transactions_for_idblag(con, id_blag)
+        tecajevi_dict = get_all_kupovni_tecajevi_for_date(con, d_datum)
+        
+        nbr_counter = 1
+        
+        for t in transactions:
+            kozonseges_tetel = ET.SubElement(kozonseges_tetelek, 'kozonseges_tetel')
+            
+            ET.SubElement(kozonseges_tetel, 'nbr').text = str(nbr_counter)
+            
+            datum_elem = ET.SubElement(kozonseges_tetel, 'datum')
+            if isinstance(t['datum_vrijeme'], datetime):
+                datum_elem.text = t['datum_vrijeme'].strftime('%Y-%m-%d %H:%M:%S')
+            else:
+                datum_elem.text = str(t['datum_vrijeme'])
+            
+            valuta = t['valuta']
+            alap_arf_tecaj = tecajevi_dict.get(valuta, 1.0)
+            
+            ET.SubElement(kozonseges_tetel, 'valto').text = str(valto_nbr)
+            ET.SubElement(kozonseges_tetel, 'felhasznalo').text = replace_croatian_chars(t['korisnik_ime'])
+            ET.SubElement(kozonseges_tetel, 'tranzakcio').text = str(t['serijski_broj']) if t['serijski_broj'] else ''
+            ET.SubElement(kozonseges_tetel, 'dokumentumszam').text = replace_croatian_chars(t['br_kartice'])
+            ET.SubElement(kozonseges_tetel, 'valuta').text = str(t['valuta']) if t['valuta'] else ''
+            ET.SubElement(kozonseges_tetel, 'fiz_mod').text = replace_croatian_chars(t['oznaka_platnog'])
+            ET.SubElement(kozonseges_tetel, 'ertek').text = f"{float(t['iznos_valuta']):.2f}" if t['iznos_valuta'] else '0.00'
+            ET.SubElement(kozonseges_tetel, 'akt_arf').text = str(t['primjenjeni_tecaj']) if t['primjenjeni_tecaj'] else ''
+            ET.SubElement(kozonseges_tetel, 'alap_arf').text = str(alap_arf_tecaj) if alap_arf_tecaj else ''
+            ET.SubElement(kozonseges_tetel, 'bank_arf').text = f"{float(t['provbanke']):.2f}" if t['provbanke'] else '0.00'
+            ET.SubElement(kozonseges_tetel, 'honnan_hova').text = ''
+            ET.SubElement(kozonseges_tetel, 'vevo_kod').text = replace_croatian_chars(t['prodaoime'])
+            ET.SubElement(kozonseges_tetel, 'vevo_cim').text = ''
+            ET.SubElement(kozonseges_tetel, 'vevo_utlevel_id').text = replace_croatian_chars(t['prodaodok'])
+            
+            vevo_orszag_value = 'N' if t['prodaodok'] and 'BIH' not in str(t['prodaodok']).upper() else ''
+            ET.SubElement(kozonseges_tetel, 'vevo_orszag').text = vevo_orszag_value
+            
+            nbr_counter += 1
+        
+        current_date += timedelta(days=1)
+    
+    tree = ET.ElementTree(root)
+    ET.indent(tree, space="  ")
+    tree.write(filepath, encoding='UTF-8', xml_declaration=True)
+    
+    # Post-processing: zamjena self-closing tagova
+    with open(filepath, 'r', encoding='UTF-8') as f:
+        xml_content = f.read()
+    
+    tags_to_fix = ['honnan_hova', 'vevo_kod', 'vevo_cim', 'vevo_utlevel_id', 'vevo_orszag']
+    
+    for tag in tags_to_fix:
+        xml_content = xml_content.replace(f'<{tag} />', f'<{tag}></{tag}>')
+        xml_content = xml_content.replace(f'<{tag}/>', f'<{tag}></{tag}>')
+    
+    with open(filepath, 'w', encoding='UTF-8') as f:
+        f.write(xml_content)
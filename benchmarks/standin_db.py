@@ -0,0 +1,243 @@
+"""
+Sintetička zamjenska baza za benchmarke exporta (bez Firebird baze).
+
+Gradi SQLite datoteku s istim tablicama i stupcima koje export čita (FIRME,
+BLAGAJNA, BLAGAJNA_STANJE, VALUTE, TECAJEVI, BLAGAJNICKE_TRANSAKCIJE,
+KORISNICI) u formatu lokalnog mirrora (mirror.py). Export je čita kroz
+[EXPORT] source=mirror, pa ide istim putem (StatementCache, DB-API kursor,
+fetchmany) i dobiva iste Python tipove kao iz fdb-a.
+
+Veličina se zadaje kao dani x valute x transakcija po danu. Imena kupaca i
+korisnika su namjerno puna dijakritičkih znakova (i poneki '&' / '<'), jer
+su to najskuplja tekstualna polja u XML-u.
+
+Primjer:
+    python benchmarks/standin_db.py --output bench.sqlite
+    python benchmarks/standin_db.py --output bench.sqlite --days 90 --currencies 20 --per-day 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import exporter
+from cli import parse_cli_date
+from config import load_config
+from mirror import BATCH_SIZE, MIRROR_INDEXES, open_mirror_connection
+
+# Deklarirani tipovi kao u mirroru (DECIMAL_TEXT / FB_DATE / FB_TIMESTAMP
+# vraćaju Decimal / date / datetime, kao fdb)
+SCHEMA = (
+    'CREATE TABLE FIRME (IDFIRME INTEGER, UNIQUEID TEXT)',
+    'CREATE TABLE VALUTE (VALUTA_BROJCANO TEXT, PROV_ZA_BANKU DECIMAL_TEXT, PROVBANKE DECIMAL_TEXT)',
+    'CREATE TABLE KORISNICI (IDKOR INTEGER, IME TEXT)',
+    'CREATE TABLE BLAGAJNA (IDBLAG INTEGER, TL_DATUM_TECAJNE_LISTE FB_DATE)',
+    'CREATE TABLE BLAGAJNA_STANJE (IDBLAG INTEGER, VALUTA_BROJCANO TEXT, IZNOS DECIMAL_TEXT)',
+    '''CREATE TABLE TECAJEVI (TL_DATUM_TECAJNE_LISTE FB_DATE, VMT_VRSTA_TECAJA TEXT,
+        VALUTA_BROJCANO TEXT, KUPOVNI_TECAJ DECIMAL_TEXT)''',
+    '''CREATE TABLE BLAGAJNICKE_TRANSAKCIJE (ID_BT INTEGER, IDBLAG INTEGER,
+        TEC_TL_DATUM_TECAJNE_LISTE FB_TIMESTAMP, TEC_VALUTA_BROJCANO TEXT,
+        IZNOS_U_VALUTI DECIMAL_TEXT, IZNOS_U_KUNAMA DECIMAL_TEXT,
+        DATUM_I_VRIJEME_TRANSAKCIJE FB_TIMESTAMP, SERIJSKI_BROJ TEXT, BR_KARTICE TEXT,
+        OZNAKA_PLATNOG_INSTRUMENTA_U_K TEXT, PRIMJENJENI_TECAJ DECIMAL_TEXT,
+        PRODAOIME TEXT, PRODAODOK TEXT, VTR_VRSTA_TRANSAKCIJE TEXT, SISUSER INTEGER)''',
+)
+
+# ISO 4217 brojčane šifre; --currencies uzima prvih n (više od 30 -> umjetne šifre)
+CURRENCY_CODES = (
+    '978', '840', '756', '826', '036', '124', '203', '208', '348', '392',
+    '578', '752', '985', '946', '941', '977', '807', '008', '949', '191',
+    '554', '710', '344', '702', '156', '643', '980', '484', '986', '356',
+)
+
+FIRST_NAMES = ('Đurđa', 'Čedomir', 'Šimun', 'Željka', 'Ćiril', 'Anđela', 'Tomislav', 'Ljiljana', 'Ivan', 'Mirela')
+LAST_NAMES = ('Čačić', 'Šoštarić', 'Žužić', 'Đukić', 'Ćosić', 'Kovačević', 'Horvat', 'Babić', 'Matić & sin', 'Šarić <d.o.o.>')
+PAYMENT_CODES = ('G', 'K', 'C', '')
+DOCUMENT_PREFIXES = ('HR', 'BIH', 'SLO', 'ČG', 'Ž')
+
+STANDIN_VALTO_NBR = '009'
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def currency_codes(count):
+    """Vraća count šifri valuta."""
+    codes = list(CURRENCY_CODES[:count])
+    codes.extend(f'{900 + i:03d}' for i in range(count - len(codes)))
+    return codes
+
+
+def _insert(con, table, rows, counts):
+    """executemany u blokovima od BATCH_SIZE; broji slogove i naredbe."""
+    if not rows:
+        return
+    sql = f"INSERT INTO {table} VALUES ({', '.join('?' * len(rows[0]))})"
+    for i in range(0, len(rows), BATCH_SIZE):
+        con.executemany(sql, rows[i:i + BATCH_SIZE])
+        counts['statements'] += 1
+    counts['rows'] += len(rows)
+
+
+def build_standin(path, start_date, days=30, currencies=10, per_day=2000, users=25, seed=1, progress=None):
+    """
+    Kreira zamjensku bazu (postojeća datoteka se briše).
+    
+    Svaki dan ima jedan BLAGAJNA slog, stanje i RED/SRE tečaj za svaku
+    valutu te per_day transakcija. Tečajna lista nedjeljom ne postoji (kao u
+    produkciji), pa se koristi i zamjenski tečaj.
+    
+    Parametri:
+        path: putanja do SQLite datoteke
+        start_date: datetime.date prvog dana
+        days: broj dana
+        currencies: broj valuta
+        per_day: broj transakcija po danu
+        users: broj korisnika (KORISNICI)
+        seed: sjeme generatora (isti parametri -> ista baza)
+        progress: opcionalna funkcija (dan, broj slogova do sad) nakon svakog dana
+    
+    Vraća:
+        dictionary {rows, statements} - zapisani slogovi i SQL naredbe
+    """
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    
+    rnd = random.Random(seed)
+    codes = currency_codes(currencies)
+    counts = {'rows': 0, 'statements': 0}
+    
+    con = open_mirror_connection(path)
+    try:
+        for sql in SCHEMA:
+            con.execute(sql)
+            counts['statements'] += 1
+        
+        _insert(con, 'FIRME', [(1, STANDIN_VALTO_NBR)], counts)
+        _insert(con, 'VALUTE', [
+            (code, Decimal(rnd.choice(('0.000', '1.125', '1.500', '2.000'))),
+             rnd.choice((None, Decimal('0.50'), Decimal('1.25'))))
+            for code in codes
+        ], counts)
+        _insert(con, 'KORISNICI', [
+            (idkor, f'{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}')
+            for idkor in range(1, users + 1)
+        ], counts)
+        
+        base_rates = {code: rnd.uniform(0.05, 9.0) for code in codes}
+        id_bt = 0
+        
+        for day_offset in range(days):
+            day = start_date + timedelta(days=day_offset)
+            id_blag = day_offset + 1
+            day_start = datetime(day.year, day.month, day.day)
+            
+            _insert(con, 'BLAGAJNA', [(id_blag, day)], counts)
+            _insert(con, 'BLAGAJNA_STANJE', [
+                (id_blag, code, Decimal(rnd.randint(0, 10 ** 8)).scaleb(-2))
+                for code in codes
+            ], counts)
+            
+            if day.weekday() != 6:
+                rates = []
+                for code in codes:
+                    rate = Decimal(base_rates[code] * rnd.uniform(0.98, 1.02)).quantize(Decimal('0.000001'))
+                    rates.append((day, 'RED', code, rate))
+                    rates.append((day, 'SRE', code, rate))
+                _insert(con, 'TECAJEVI', rates, counts)
+            
+            transactions = []
+            for i in range(per_day):
+                id_bt += 1
+                code = rnd.choice(codes)
+                amount = Decimal(rnd.randint(100, 5000000)).scaleb(-2)
+                rate = Decimal(base_rates[code]).quantize(Decimal('0.000001'))
+                transactions.append((
+                    id_bt,
+                    id_blag,
+                    day_start,
+                    code,
+                    amount,
+                    (amount * rate).quantize(Decimal('0.01')),
+                    day_start + timedelta(hours=7, seconds=i * 50400 // per_day),
+                    f'{id_bt:010d}',
+                    f'{rnd.choice(DOCUMENT_PREFIXES)}{rnd.randint(0, 9999999):07d}',
+                    rnd.choice(PAYMENT_CODES),
+                    rate,
+                    f'{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}',
+                    f'{rnd.choice(DOCUMENT_PREFIXES)}{rnd.randint(0, 9999999):07d}',
+                    'FG',
+                    rnd.randint(1, users),
+                ))
+            _insert(con, 'BLAGAJNICKE_TRANSAKCIJE', transactions, counts)
+            
+            if progress is not None:
+                progress(day, counts['rows'])
+        
+        for sql in MIRROR_INDEXES:
+            con.execute(sql)
+            counts['statements'] += 1
+        
+        con.commit()
+    finally:
+        con.close()
+    
+    return counts
+
+
+def configure_standin(path, **export_overrides):
+    """
+    Konfigurira exporter za čitanje iz zamjenske baze ([EXPORT] source=mirror).
+    Konfiguracija se uzima iz REPORT.INI.example (FTP se ne koristi), a
+    REPORT.INI aplikacije se ne čita.
+    
+    Parametri:
+        path: putanja do zamjenske baze (ili kopije mirrora)
+        export_overrides: dodatne [EXPORT] vrijednosti (npr. workers=4)
+    """
+    config = load_config(os.path.join(ROOT, 'REPORT.INI.example'))
+    config['export'].update({
+        'source': 'mirror',
+        'mirror_path': path,
+        'incremental': False,
+        'rate_cache_file': None,
+    })
+    config['export'].update(export_overrides)
+    exporter.configure(config)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sintetička zamjenska baza za benchmarke exporta.")
+    parser.add_argument('--output', required=True,
+                        help="SQLite datoteka (postojeća se briše)")
+    parser.add_argument('--start', type=parse_cli_date, default=date(2026, 1, 1),
+                        help="prvi dan (default 2026-01-01)")
+    parser.add_argument('--days', type=int, default=30,
+                        help="broj dana (default 30)")
+    parser.add_argument('--currencies', type=int, default=10,
+                        help="broj valuta (default 10)")
+    parser.add_argument('--per-day', type=int, default=2000,
+                        help="transakcija po danu (default 2000)")
+    parser.add_argument('--seed', type=int, default=1,
+                        help="sjeme generatora (default 1)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+    counts = build_standin(args.output, args.start, args.days, args.currencies, args.per_day, seed=args.seed)
+    seconds = time.perf_counter() - started
+    print(f"{args.output}: {counts['rows']} slogova, {counts['statements']} naredbi, "
+          f"{os.path.getsize(args.output)} B, {seconds:.2f} s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,334 @@
+"""
+Export blagajničkih transakcija iz komandne linije, bez GUI-a.
+
+Ne uvozi tkinter ni tkcalendar pa je pogodan za zakazane (noćne) exporte.
+
+Primjer:
+    python cli.py --start 2026-02-01 --end 2026-02-28 --upload
+    python cli.py --start 2026-02-01 --end 2026-02-28 --stream
+    python cli.py --start 2026-01-01 --end 2026-02-28 --incremental --upload
+    python cli.py --drain-queue
+    python cli.py --history --history-limit 50
+    python cli.py --start 2026-02-01 --end 2026-02-28 --profile
+    python cli.py --sync-mirror
+    python cli.py --sync-mirror --source mirror --start 2025-01-01 --end 2025-12-31
+    python cli.py --start 2026-02-21 --end 2026-02-21 --ini D:/REPORT.INI --output-dir D:/XML
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+import exporter
+import mirror
+import run_history
+from config import load_config, ConfigError, SOURCES
+from upload_queue import UploadQueue
+
+
+def parse_cli_date(value):
+    """Pretvara 'YYYY-MM-DD' argument u datetime.date."""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"neispravan datum '{value}', očekuje se YYYY-MM-DD")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Export blagajničkih transakcija u XML (bez GUI-a)."
+    )
+    parser.add_argument('--start', type=parse_cli_date,
+                        help="početni datum (YYYY-MM-DD)")
+    parser.add_argument('--end', type=parse_cli_date,
+                        help="završni datum (YYYY-MM-DD)")
+    parser.add_argument('--ini', default=None,
+                        help="putanja do REPORT.INI (default: folder aplikacije)")
+    parser.add_argument('--output-dir', default=None,
+                        help=f"folder za XML (default: {exporter.XML_FOLDER})")
+    parser.add_argument('--upload', action='store_true',
+                        help="nakon generiranja pošalji XML na FTP server")
+    parser.add_argument('--stream', action='store_true',
+                        help="šalji XML na FTP dok se generira (bez čekanja na datoteku)")
+    parser.add_argument('--no-local-copy', action='store_true',
+                        help="uz --stream: ne spremaj lokalnu kopiju XML-a")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--incremental', dest='incremental', action='store_true', default=None,
+                      help="exportaj samo podatke novije od watermarka")
+    mode.add_argument('--full', dest='incremental', action='store_false',
+                      help="puni re-export raspona (zanemari watermark)")
+    parser.add_argument('--drain-queue', action='store_true',
+                        help="pošalji sve datoteke iz reda za slanje i izađi")
+    parser.add_argument('--sync-mirror', action='store_true',
+                        help="osvježi lokalni SQLite mirror iz Firebird baze (prije exporta)")
+    parser.add_argument('--since', type=parse_cli_date, default=None,
+                        help="uz --sync-mirror: početni datum prvog kopiranja (default [MIRROR] since)")
+    parser.add_argument('--history', action='store_true',
+                        help="ispiši povijest exporta i označi sporije exporte, pa izađi")
+    parser.add_argument('--history-limit', type=int, default=20,
+                        help="uz --history: broj zadnjih exporta u ispisu (default 20)")
+    parser.add_argument('--history-threshold', type=float, default=run_history.DEFAULT_THRESHOLD,
+                        help="uz --history: označi export sporiji od ovog udjela medijana "
+                             f"(default {run_history.DEFAULT_THRESHOLD})")
+    parser.add_argument('--source', choices=SOURCES, default=None,
+                        help="izvor podataka za export (default [EXPORT] source)")
+    parser.add_argument('--profile', action='store_true',
+                        help="profiliraj export i slanje (cProfile + tracemalloc, datoteke pored XML-a)")
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help="ispisuj napredak po danima")
+    
+    args = parser.parse_args(argv)
+    
+    if args.drain_queue or args.history:
+        return args
+    if args.sync_mirror and args.start is None and args.end is None:
+        return args
+    if args.start is None or args.end is None:
+        parser.error("--start i --end su obavezni (osim uz --drain-queue / --sync-mirror / --history)")
+    if args.end < args.start:
+        parser.error("završni datum ne može biti manji od početnog")
+    if args.no_local_copy and not args.stream:
+        parser.error("--no-local-copy se koristi samo uz --stream")
+    
+    return args
+
+
+def print_progress(info):
+    print(
+        f"{info['day']} ({info['days_done']}/{info['days_total']}) "
+        f"{info['rows_written']} slogova, {info['bytes_written']} B",
+        file=sys.stderr
+    )
+
+
+def print_rate_stats():
+    stats = exporter.get_rate_index_stats()
+    if stats is None:
+        return
+    print(
+        f"Tečajevi: {stats['exact_hits']} na datum, {stats['last_known_hits']} zadnji poznati, "
+        f"{stats['default_hits']} zamjenski 1.0, {stats['missing']} valuta/dana bez tečaja, "
+        f"{stats['queries']} upita",
+        file=sys.stderr
+    )
+
+
+def print_metrics():
+    metrics = exporter.get_export_metrics()
+    if metrics is not None and exporter.EXPORT_CONFIG['metrics']:
+        print(metrics.format_summary(), file=sys.stderr)
+
+
+def print_profile(operation, filename, output_dir=None):
+    if exporter.EXPORT_CONFIG['profile']:
+        stats_path, allocations_path = exporter.profile_paths(operation, filename, output_dir)
+        print(f"Profil: {stats_path}, {allocations_path}", file=sys.stderr)
+
+
+def sync_mirror(config, since=None):
+    """
+    Osvježava lokalni SQLite mirror iz Firebird baze.
+    Vraća: exit code (0 uspjeh, 1 greška)
+    """
+    if since is None and config['export']['mirror_since']:
+        since = exporter.parse_date(config['export']['mirror_since'])
+    
+    try:
+        source_con = exporter.open_firebird_connection()
+    except Exception as e:
+        print(f"Greška: ne mogu se spojiti na bazu: {e}", file=sys.stderr)
+        return 1
+    
+    try:
+        counts = mirror.sync_mirror(
+            source_con,
+            config['export']['mirror_path'],
+            since,
+            progress=lambda table, rows: print(f"{table}: {rows} slogova", file=sys.stderr)
+        )
+    except Exception as e:
+        print(f"Greška pri osvježavanju mirrora: {e}", file=sys.stderr)
+        return 1
+    finally:
+        source_con.close()
+    
+    print(f"Mirror osvježen: {config['export']['mirror_path']} ({sum(counts.values())} slogova)")
+    return 0
+
+
+def drain_queue(output_dir=None):
+    """
+    Šalje datoteke iz reda za slanje (upload_queue.json).
+    Vraća: exit code (0 ako je red prazan, 1 ako je nešto ostalo ili je odloženo)
+    """
+    def on_event(kind, payload):
+        if kind == 'queue_sent':
+            print(f"Poslano: {payload}")
+        elif kind == 'queue_error':
+            print(f"Greška pri slanju {payload[0]}: {payload[1]}", file=sys.stderr)
+        elif kind == 'queue_rejected':
+            print(f"Server je odbio {payload[0]} (odloženo): {payload[1]}", file=sys.stderr)
+    
+    upload_queue = UploadQueue(output_dir, on_event=on_event)
+    sent, remaining = upload_queue.drain()
+    
+    if remaining:
+        print(f"Greška: {remaining} datoteka i dalje čeka slanje", file=sys.stderr)
+        return 1
+    rejected = upload_queue.rejected()
+    if rejected:
+        print(f"Greška: server je odbio {len(rejected)} datoteka ({sent} poslano); "
+              f"ostaju odložene u {upload_queue.manifest_path}", file=sys.stderr)
+        return 1
+    
+    print(f"Red za slanje je prazan ({sent} poslano)")
+    return 0
+
+
+def print_history(config, limit=20, threshold=run_history.DEFAULT_THRESHOLD):
+    """
+    Ispisuje zadnjih limit slogova povijesti exporta sa slogova/s i pomičnim
+    medijanom poslovnice; exporte sporije od threshold * medijan označava s '!'.
+    Vraća: exit code (0, ili 1 ako je neki ispisani export označen)
+    """
+    path = config['export']['history_file']
+    runs = run_history.load_runs(path) if path else []
+    if not runs:
+        print(f"Povijest exporta je prazna ({path}); uključite [EXPORT] history=1")
+        return 0
+    
+    results = run_history.find_regressions(runs, threshold)[-limit:]
+    
+    print(f"{'vrijeme':<19} {'verzija':<8} {'operacija':<11} {'status':<9} {'valto':<6} "
+          f"{'raspon':<21} {'dana':>5} {'transakcija':>11} {'sekundi':>8} {'slogova/s':>10} {'medijan':>10}")
+    flagged_runs = []
+    for run, speed, median, flagged in results:
+        date_range = f"{run['start_date']}..{run['end_date']}" if run['start_date'] else '-'
+        print(
+            f"{run['started_at']:<19} {run['app_version'] or '-':<8} {run['operation']:<11} "
+            f"{run['status']:<9} {run['valto_nbr'] or '-':<6} {date_range:<21} "
+            f"{run['days'] or 0:>5} {run['transactions'] or 0:>11} {run['total_seconds'] or 0:>8.1f} "
+            f"{'-' if speed is None else f'{speed:.0f}':>10} "
+            f"{'-' if median is None else f'{median:.0f}':>10}{' !' if flagged else ''}"
+        )
+        if flagged:
+            flagged_runs.append((run, speed, median))
+    
+    if flagged_runs:
+        print(f"\nSporiji exporti (ispod {threshold:.0%} medijana poslovnice) - provjerite indekse i veličinu baze:",
+              file=sys.stderr)
+        for run, speed, median in flagged_runs:
+            print(f"  {run['started_at']} valto {run['valto_nbr']}: {speed:.0f} slogova/s "
+                  f"(medijan {median:.0f}, {run['source']})", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv=None):
+    """
+    Pokreće export (i opcionalno upload).
+    Vraća: exit code (0 uspjeh, 1 greška)
+    """
+    args = parse_args(argv)
+    
+    try:
+        config = load_config(args.ini)
+    except ConfigError as e:
+        print(f"Greška: {e}", file=sys.stderr)
+        return 1
+    
+    exporter.configure(config)
+    
+    if args.drain_queue:
+        return drain_queue(args.output_dir)
+    
+    if args.history:
+        return print_history(config, args.history_limit, args.history_threshold)
+    
+    if args.sync_mirror:
+        result = sync_mirror(config, args.since)
+        if result != 0 or args.start is None:
+            return result
+    
+    # configure() drži referencu na isti dictionary
+    if args.source is not None:
+        config['export']['source'] = args.source
+    if args.profile:
+        config['export']['profile'] = True
+    
+    try:
+        exporter.connect_to_database()
+        
+        valto_nbr = exporter.get_uniqueid()
+        if not valto_nbr:
+            print("Greška: UNIQUEID nije pronađen u tablici FIRME", file=sys.stderr)
+            return 1
+        
+        progress = print_progress if args.verbose else None
+        
+        if args.stream:
+            filename = exporter.export_and_send(
+                valto_nbr,
+                args.start,
+                args.end,
+                progress=progress,
+                output_dir=args.output_dir,
+                keep_local_copy=False if args.no_local_copy else None,
+                incremental=args.incremental
+            )
+            if args.verbose:
+                print_rate_stats()
+                print_metrics()
+            print_profile('export_send', filename, args.output_dir)
+            print(f"XML kreiran i poslan: {filename} -> {config['ftp']['host']}")
+            return 0
+        
+        filename = exporter.generate_xml(
+            valto_nbr,
+            args.start,
+            args.end,
+            progress=progress,
+            output_dir=args.output_dir,
+            incremental=args.incremental
+        )
+        if args.verbose:
+            print_rate_stats()
+            print_metrics()
+        print_profile('export', filename, args.output_dir)
+        print(f"XML kreiran: {filename}")
+        
+        if args.upload:
+            try:
+                exporter.upload_to_ftp(filename, output_dir=args.output_dir)
+            except Exception as e:
+                UploadQueue(args.output_dir).enqueue(filename)
+                print(f"Greška pri slanju: {e}\nDatoteka je dodana u red za slanje.", file=sys.stderr)
+                return 1
+            if args.verbose:
+                print_metrics()
+            print_profile('upload', filename, args.output_dir)
+            print(f"Datoteka poslana: {filename} -> {config['ftp']['host']}")
+        
+        return 0
+    
+    except exporter.NoNewData as e:
+        print(f"{e} - datoteka nije kreirana")
+        return 0
+    
+    except exporter.UploadFailed as e:
+        UploadQueue(args.output_dir).enqueue(e.filename)
+        print(f"XML kreiran: {e.filename}", file=sys.stderr)
+        print(f"Greška pri slanju: {e}\nDatoteka je dodana u red za slanje.", file=sys.stderr)
+        return 1
+    
+    except Exception as e:
+        print(f"Greška: {e}", file=sys.stderr)
+        return 1
+    
+    finally:
+        exporter.close_database_connection()
+        exporter.close_ftp_uploader()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Učitavanje konfiguracije iz REPORT.INI datoteke.
+
+Modul ne ovisi o GUI-u - greške se javljaju kao ConfigError, a app.py ih
+prikazuje u messageboxu, dok ih cli.py ispisuje na stderr.
+"""
+
+import os
+import sys
+import configparser
+
+CONFIG_FILE = 'REPORT.INI'
+
+# Verzija aplikacije (zapisuje se u povijest exporta)
+APP_VERSION = '1.0.0'
+
+# Watermark inkrementalnog exporta, sprema se pored REPORT.INI
+WATERMARK_FILE = 'export_watermark.json'
+
+# Lokalni SQLite mirror tablica za export, default pored REPORT.INI
+MIRROR_FILE = 'mirror.sqlite'
+
+# Log mjerenja exporta ([EXPORT] metrics=1), default pored REPORT.INI
+METRICS_LOG_FILE = 'export_metrics.log'
+
+# Povijest exporta ([EXPORT] history=1, run_history.py), default pored REPORT.INI
+HISTORY_FILE = 'run_history.sqlite'
+
+# Dozvoljene vrijednosti za [EXPORT] output_format i compression
+OUTPUT_FORMATS = ('indented', 'compact')
+COMPRESSIONS = ('none', 'gzip', 'zip')
+SOURCES = ('firebird', 'mirror')
+RATE_FALLBACKS = ('default', 'last_known')
+TEXT_ESCAPINGS = ('legacy', 'charref', 'utf8')
+ROW_FORMATTERS = ('compiled', 'generic')
+MONEY_MODES = ('float', 'fixed')
+
+
+class ConfigError(Exception):
+    """Konfiguracijska datoteka ne postoji ili nije ispravna."""
+
+
+def get_application_path():
+    """
+    Vraća folder aplikacije.
+    Ako se pokreće kao .exe, to je folder u kojem je .exe.
+    """
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def load_config(config_path=None):
+    """
+    Učitava konfiguraciju iz REPORT.INI datoteke.
+    
+    Parametri:
+        config_path: putanja do INI datoteke (default REPORT.INI u folderu aplikacije)
+    
+    Vraća:
+        dictionary s konfiguracijskim podacima
+    
+    Baca:
+        ConfigError ako datoteka ne postoji ili nije ispravna
+    """
+    if config_path is None:
+        config_path = os.path.join(get_application_path(), CONFIG_FILE)
+    
+    if not os.path.exists(config_path):
+        raise ConfigError(
+            f"Konfiguracijska datoteka nije pronađena:\n{config_path}\n\n"
+            f"Molimo kreirajte REPORT.INI datoteku u folderu aplikacije."
+        )
+    
+    try:
+        config = configparser.ConfigParser()
+        config.read(config_path, encoding='utf-8')
+        
+        # Učitaj DATABASE sekciju
+        db_config = {
+            'database': config.get('DATABASE', 'database'),
+            'host': config.get('DATABASE', 'host'),
+            'user': config.get('DATABASE', 'user'),
+            'password': config.get('DATABASE', 'password'),
+            'charset': 'UTF8'
+        }
+        
+        # Učitaj FTP sekciju
+        ftp_config = {
+            'host': config.get('FTP', 'host'),
+            'user': config.get('FTP', 'user'),
+            'password': config.get('FTP', 'password'),
+            'port': config.getint('FTP', 'port', fallback=21),
+            'timeout': config.getint('FTP', 'timeout', fallback=60),
+            'retries': max(0, config.getint('FTP', 'retries', fallback=3)),
+            'retry_delay': config.getfloat('FTP', 'retry_delay', fallback=2.0),
+            'auto_upload': config.getboolean('FTP', 'auto_upload', fallback=False),
+            'queue_workers': max(1, config.getint('FTP', 'queue_workers', fallback=1)),
+            'queue_retry_interval': config.getint('FTP', 'queue_retry_interval', fallback=60)
+        }
+        
+        # Učitaj EXPORT sekciju (opcionalna)
+        export_config = {
+            'fetch_size': config.getint('EXPORT', 'fetch_size', fallback=500),
+            'workers': max(1, config.getint('EXPORT', 'workers', fallback=1)),
+            'shard_days': max(1, config.getint('EXPORT', 'shard_days', fallback=7)),
+            'keep_local_copy': config.getboolean('EXPORT', 'keep_local_copy', fallback=True),
+            'output_format': config.get('EXPORT', 'output_format', fallback='indented').strip().lower(),
+            'compression': config.get('EXPORT', 'compression', fallback='none').strip().lower(),
+            'text_escaping': config.get('EXPORT', 'text_escaping', fallback='legacy').strip().lower(),
+            'row_formatter': config.get('EXPORT', 'row_formatter', fallback='compiled').strip().lower(),
+            'money': config.get('EXPORT', 'money', fallback='float').strip().lower(),
+            'incremental': config.getboolean('EXPORT', 'incremental', fallback=False),
+            'watermark_file': config.get(
+                'EXPORT', 'watermark_file',
+                fallback=os.path.join(os.path.dirname(os.path.abspath(config_path)), WATERMARK_FILE)
+            ),
+            'source': config.get('EXPORT', 'source', fallback='firebird').strip().lower(),
+            'mirror_path': config.get(
+                'MIRROR', 'path',
+                fallback=os.path.join(os.path.dirname(os.path.abspath(config_path)), MIRROR_FILE)
+            ),
+            'mirror_since': config.get('MIRROR', 'since', fallback='').strip() or None,
+            'rate_fallback': config.get('EXPORT', 'rate_fallback', fallback='default').strip().lower(),
+            'rate_cache_file': config.get('EXPORT', 'rate_cache_file', fallback='').strip() or None,
+            'metrics': config.getboolean('EXPORT', 'metrics', fallback=False),
+            'metrics_log': config.get(
+                'EXPORT', 'metrics_log',
+                fallback=os.path.join(os.path.dirname(os.path.abspath(config_path)), METRICS_LOG_FILE)
+            ).strip() or None,
+            'history': config.getboolean('EXPORT', 'history', fallback=False),
+            'history_file': config.get(
+                'EXPORT', 'history_file',
+                fallback=os.path.join(os.path.dirname(os.path.abspath(config_path)), HISTORY_FILE)
+            ).strip() or None,
+            'profile': config.getboolean('EXPORT', 'profile', fallback=False),
+            'profile_top': max(1, config.getint('EXPORT', 'profile_top', fallback=25))
+        }
+        
+        if export_config['output_format'] not in OUTPUT_FORMATS:
+            raise ValueError(
+                f"[EXPORT] output_format mora biti jedno od: {', '.join(OUTPUT_FORMATS)}"
+            )
+        if export_config['source'] not in SOURCES:
+            raise ValueError(
+                f"[EXPORT] source mora biti jedno od: {', '.join(SOURCES)}"
+            )
+        if export_config['compression'] not in COMPRESSIONS:
+            raise ValueError(
+                f"[EXPORT] compression mora biti jedno od: {', '.join(COMPRESSIONS)}"
+            )
+        if export_config['text_escaping'] not in TEXT_ESCAPINGS:
+            raise ValueError(
+                f"[EXPORT] text_escaping mora biti jedno od: {', '.join(TEXT_ESCAPINGS)}"
+            )
+        if export_config['row_formatter'] not in ROW_FORMATTERS:
+            raise ValueError(
+                f"[EXPORT] row_formatter mora biti jedno od: {', '.join(ROW_FORMATTERS)}"
+            )
+        if export_config['money'] not in MONEY_MODES:
+            raise ValueError(
+                f"[EXPORT] money mora biti jedno od: {', '.join(MONEY_MODES)}"
+            )
+        if export_config['rate_fallback'] not in RATE_FALLBACKS:
+            raise ValueError(
+                f"[EXPORT] rate_fallback mora biti jedno od: {', '.join(RATE_FALLBACKS)}"
+            )
+        
+        return {
+            'database': db_config,
+            'ftp': ftp_config,
+            'export': export_config
+        }
+    
+    except Exception as e:
+        raise ConfigError(f"Greška pri učitavanju REPORT.INI:\n{e}") from e
@@ -0,0 +1,2686 @@
+"""
+Export blagajničkih transakcija iz Firebird baze u XML i slanje na FTP.
+
+Modul ne ovisi o GUI-u (tkinter/tkcalendar) pa ga koriste i app.py i cli.py.
+Prije korištenja treba pozvati configure() s rezultatom config.load_config().
+"""
+
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+import os
+import sqlite3
+import json
+import bisect
+import gzip
+import zipfile
+import time
+import queue
+import threading
+import cProfile
+import tracemalloc
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from ftplib import FTP, all_errors as FTP_ERRORS, error_perm
+
+from config import APP_VERSION
+from mirror import open_mirror_connection, translate_sql
+from run_history import record_run
+
+# ═══════════════════════════════════════════════════════════
+# GLOBALNE VARIJABLE
+# ═══════════════════════════════════════════════════════════
+
+# Default folder za XML datoteke
+XML_FOLDER = 'C:/XML'
+
+# Globalna konekcija na bazu
+global_connection = None
+
+# Cache pripremljenih upita za globalnu konekciju
+statement_cache = None
+
+# Pool konekcija za paralelnu ekstrakciju (EXPORT workers > 1)
+connection_pool = None
+
+# Zajednička FTP sesija za slanje datoteka (get_ftp_uploader)
+ftp_uploader = None
+
+# Indeks tečajeva zadnjeg exporta (za statistiku, get_rate_index_stats)
+rate_index = None
+
+# Mjerenja exporta u tijeku i zadnjeg završenog ([EXPORT] metrics, get_export_metrics)
+active_metrics = None
+last_export_metrics = None
+
+# Konfiguracija iz INI datoteke (postavlja configure)
+DB_CONFIG = None
+FTP_CONFIG = None
+EXPORT_CONFIG = None
+
+# ═══════════════════════════════════════════════════════════
+# KONFIGURACIJA
+# ═══════════════════════════════════════════════════════════
+
+def configure(config):
+    """
+    Postavlja konfiguraciju modula.
+    
+    Parametri:
+        config: dictionary iz config.load_config()
+    """
+    global DB_CONFIG, FTP_CONFIG, EXPORT_CONFIG
+    DB_CONFIG = config['database']
+    FTP_CONFIG = config['ftp']
+    EXPORT_CONFIG = config['export']
+
+
+# ═══════════════════════════════════════════════════════════
+# DATABASE CONNECTION MANAGEMENT
+# ═══════════════════════════════════════════════════════════
+
+class StatementCache:
+    """
+    Cache pripremljenih upita za jednu konekciju.
+    
+    Svaki parametrizirani upit se priprema (cursor.prep) samo jednom po
+    konekciji, a kasnije se izvršava s novim parametrima bez ponovnog
+    parsiranja i planiranja na Firebird serveru. Ključ je tekst upita.
+    
+    Za SQLite mirror (nema cursor.prep) upit se samo prevodi u SQLite
+    dijalekt; pripremljene naredbe tada čuva sam sqlite3 modul.
+    """
+    
+    def __init__(self, con):
+        self.con = con
+        self.sqlite = isinstance(con, sqlite3.Connection)
+        self._statements = {}
+        self.hits = 0
+        self.misses = 0
+        self.prep_seconds = 0.0
+    
+    def execute(self, sql, params=()):
+        """
+        Izvršava upit s parametrima i vraća kursor s rezultatom.
+        
+        Parametri:
+            sql: tekst upita s ? parametrima
+            params: tuple vrijednosti parametara
+        
+        Vraća:
+            kursor (za fetchone/fetchall/fetchmany)
+        """
+        entry = self._statements.get(sql)
+        if entry is None:
+            self.misses += 1
+            started = time.perf_counter()
+            cur = self.con.cursor()
+            entry = (cur, translate_sql(sql) if self.sqlite else cur.prep(sql))
+            self.prep_seconds += time.perf_counter() - started
+            self._statements[sql] = entry
+        else:
+            self.hits += 1
+        
+        cur, prepared = entry
+        metrics = active_metrics
+        if metrics is None:
+            cur.execute(prepared, params)
+            return cur
+        
+        started = time.perf_counter()
+        cur.execute(prepared, params)
+        metrics.add_sql(1, 0, time.perf_counter() - started)
+        return MeteredCursor(cur, metrics)
+    
+    def stats(self):
+        """
+        Vraća statistiku cache-a.
+        
+        Vraća:
+            dictionary {hits, misses, prep_seconds, saved_seconds}
+            saved_seconds je procjena (prosječno vrijeme pripreme * hits)
+        """
+        avg_prep = self.prep_seconds / self.misses if self.misses else 0.0
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'prep_seconds': self.prep_seconds,
+            'saved_seconds': avg_prep * self.hits
+        }
+
+
+def open_firebird_connection():
+    """
+    Otvara novu konekciju na Firebird bazu iz [DATABASE] sekcije.
+    fdb se uvozi tek ovdje, pa export iz mirrora radi i bez Firebird klijenta.
+    Vraća: fdb.Connection objekt
+    """
+    import fdb
+    return fdb.connect(**DB_CONFIG)
+
+
+def open_connection():
+    """
+    Otvara novu konekciju na izvor podataka za export ([EXPORT] source):
+    Firebird bazu ili lokalni SQLite mirror.
+    Vraća: fdb.Connection ili sqlite3.Connection objekt
+    """
+    if EXPORT_CONFIG['source'] == 'mirror':
+        if not os.path.exists(EXPORT_CONFIG['mirror_path']):
+            raise FileNotFoundError(
+                f"Mirror nije pronađen:\n{EXPORT_CONFIG['mirror_path']}\n\n"
+                f"Pokrenite: python cli.py --sync-mirror"
+            )
+        return open_mirror_connection(EXPORT_CONFIG['mirror_path'])
+    return open_firebird_connection()
+
+
+def connect_to_database():
+    """
+    Otvara globalnu konekciju na izvor podataka (open_connection).
+    Greška pri spajanju se prosljeđuje pozivatelju.
+    Vraća: fdb.Connection ili sqlite3.Connection objekt
+    """
+    global global_connection, statement_cache
+    if global_connection is None:
+        global_connection = open_connection()
+        statement_cache = StatementCache(global_connection)
+    return global_connection
+
+
+def get_statement_cache():
+    """
+    Vraća cache pripremljenih upita za globalnu konekciju (otvara je po potrebi).
+    Vraća: StatementCache objekt
+    """
+    connect_to_database()
+    return statement_cache
+
+
+def get_statement_cache_stats():
+    """
+    Vraća zbirnu statistiku cache-a pripremljenih upita globalne konekcije
+    i konekcija iz poola.
+    Vraća: dictionary (vidi StatementCache.stats)
+    """
+    totals = {'hits': 0, 'misses': 0, 'prep_seconds': 0.0, 'saved_seconds': 0.0}
+    
+    caches = [statement_cache] if statement_cache is not None else []
+    if connection_pool is not None:
+        caches.extend(connection_pool.caches())
+    
+    for cache in caches:
+        for key, value in cache.stats().items():
+            totals[key] += value
+    
+    return totals
+
+
+class ConnectionPool:
+    """
+    Ograničeni pool konekcija (Firebird ili mirror) za paralelnu ekstrakciju.
+    
+    Konekcije se otvaraju po potrebi, najviše size komada. Svaka konekcija
+    ima svoj StatementCache i u jednom trenutku je koristi samo jedna nit.
+    """
+    
+    def __init__(self, size):
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._caches = []
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """
+        Vraća slobodnu konekciju (kao StatementCache); čeka ako su sve zauzete.
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            can_open = len(self._caches) < self.size
+            if can_open:
+                cache = StatementCache(open_connection())
+                self._caches.append(cache)
+        
+        if can_open:
+            return cache
+        return self._idle.get()
+    
+    def release(self, cache):
+        """Vraća konekciju u pool."""
+        self._idle.put(cache)
+    
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as cache: ..."""
+        cache = self.acquire()
+        try:
+            yield cache
+        finally:
+            self.release(cache)
+    
+    def caches(self):
+        """Vraća StatementCache svih otvorenih konekcija."""
+        with self._lock:
+            return list(self._caches)
+    
+    def close(self):
+        """Zatvara sve konekcije iz poola."""
+        with self._lock:
+            for cache in self._caches:
+                try:
+                    cache.con.close()
+                except Exception as e:
+                    pass
+            self._caches = []
+        self._idle = queue.LifoQueue()
+
+
+def get_connection_pool(size):
+    """
+    Vraća globalni pool konekcija; ako je zadana druga veličina, stari se zatvara.
+    Vraća: ConnectionPool objekt
+    """
+    global connection_pool
+    if connection_pool is not None and connection_pool.size != size:
+        connection_pool.close()
+        connection_pool = None
+    if connection_pool is None:
+        connection_pool = ConnectionPool(size)
+    return connection_pool
+
+
+def close_database_connection():
+    """Zatvara globalnu konekciju na bazu i pool konekcija."""
+    global global_connection, statement_cache, connection_pool
+    if connection_pool is not None:
+        connection_pool.close()
+        connection_pool = None
+    if global_connection:
+        try:
+            global_connection.close()
+            global_connection = None
+            statement_cache = None
+        except Exception as e:
+            pass
+
+
+# ═══════════════════════════════════════════════════════════
+# HELPER FUNKCIJE
+# ═══════════════════════════════════════════════════════════
+
+# Hrvatski dijakritički znakovi koji se u tekstualnim poljima pišu kao &#x....;
+CROATIAN_CHARS = 'ČčĆćŠšŽžĐđ'
+
+
+def make_char_refs(prefix='&#x'):
+    """Vraća parove (znak, referenca) za CROATIAN_CHARS, npr. ('Č', '&#x010C;')."""
+    return tuple((char, f'{prefix}{ord(char):04X};') for char in CROATIAN_CHARS)
+
+
+def replace_chars(text, char_refs):
+    """
+    Zamjenjuje znakove iz char_refs referencama. ASCII tekst ne može sadržavati
+    CROATIAN_CHARS pa se vraća odmah, a inače se zamjenjuju samo znakovi koji
+    se stvarno pojavljuju u tekstu.
+    """
+    if text.isascii():
+        return text
+    for char, ref in char_refs:
+        if char in text:
+            text = text.replace(char, ref)
+    return text
+
+
+CROATIAN_CHAR_REFS = make_char_refs()
+
+
+def field_text(value):
+    """Vrijednost tekstualnog polja kao string ('' za None/prazno)."""
+    return str(value) if value else ''
+
+
+def parse_date(date_str):
+    """
+    Pretvara 'YYYY-MM-DD' string u datetime.date (parametar za DATE upite).
+    
+    Parametri:
+        date_str: string u formatu 'YYYY-MM-DD'
+    
+    Vraća:
+        datetime.date objekt
+    """
+    return datetime.strptime(date_str, '%Y-%m-%d').date()
+
+
+# ═══════════════════════════════════════════════════════════
+# NOVČANI IZNOSI
+# ═══════════════════════════════════════════════════════════
+
+# Iznosi, provizije i tečajevi se uz [EXPORT] money=fixed računaju kao
+# Decimal (iz baze bez gubitka, C modul decimal), a tek pri ispisu
+# zaokružuju na 2 decimale (half-up).
+CENTS = Decimal('0.01')
+
+
+def to_decimal(value):
+    """
+    Pretvara iznos u Decimal bez gubitka.
+    
+    Parametri:
+        value: Decimal, int, float ili string; float se čita kao najkraći
+               decimalni zapis (repr), pa tečaj s do 15 znamenaka ostaje točan
+    
+    Vraća:
+        Decimal
+    """
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(value if isinstance(value, (int, str)) else repr(value))
+
+
+def format_money(value):
+    """
+    Formatira Decimal kao iznos s 2 decimale (half-up).
+    
+    Parametri:
+        value: Decimal
+    
+    Vraća:
+        string, npr. '1234.57' (nikad '-0.00')
+    """
+    text = str(value.quantize(CENTS, ROUND_HALF_UP))
+    return '0.00' if text == '-0.00' else text
+
+
+def float_amount_text(value):
+    """Iznos s 2 decimale preko float (dosadašnji ispis, [EXPORT] money=float)."""
+    return f"{float(value):.2f}"
+
+
+def fixed_amount_text(value):
+    """Iznos s 2 decimale, točno i half-up ([EXPORT] money=fixed)."""
+    return format_money(to_decimal(value))
+
+
+def float_product_text(amount, rate):
+    """amount * rate s 2 decimale preko float ([EXPORT] money=float)."""
+    return f"{float(amount) * rate:.2f}"
+
+
+@lru_cache(maxsize=4096)
+def _decimal_rate(rate):
+    """to_decimal za tečaj - tečajeva je malo (valuta x dan), pa se pamte."""
+    return to_decimal(rate)
+
+
+def fixed_product_text(amount, rate):
+    """amount * rate s 2 decimale, točno i half-up ([EXPORT] money=fixed)."""
+    return format_money(to_decimal(amount) * _decimal_rate(rate))
+
+
+def float_percent_rest_text(percent):
+    """100 - percent s 2 decimale preko float ([EXPORT] money=float)."""
+    return f"{100 - float(percent):.2f}"
+
+
+def fixed_percent_rest_text(percent):
+    """100 - percent s 2 decimale, točno i half-up ([EXPORT] money=fixed)."""
+    return format_money(100 - to_decimal(percent))
+
+
+# [EXPORT] money -> (iznos, umnožak iznosa i tečaja, 100 - postotak)
+MONEY_FORMATTERS = {
+    'float': (float_amount_text, float_product_text, float_percent_rest_text),
+    'fixed': (fixed_amount_text, fixed_product_text, fixed_percent_rest_text),
+}
+
+
+# ═══════════════════════════════════════════════════════════
+# MODEL SLOGOVA
+# ═══════════════════════════════════════════════════════════
+
+# Slogovi se drže kao namedtuple (tuple bez __dict__), a ne kao dictionary
+# po slogu: polja se čitaju po imenu (t.valuta), a slog transakcije se gradi
+# izravno iz tuplea koji vraća fetchmany (Transaction._make) - redoslijed
+# polja je redoslijed stupaca u upitu.
+
+# BLAGAJNA_STANJE + VALUTE; tečaj se traži u RateIndex (load_rate_index)
+StanjeRow = namedtuple('StanjeRow', ('valuta', 'iznos', 'prov_za_banku'))
+
+# BLAGAJNICKE_TRANSAKCIJE + VALUTE + KORISNICI; provbanke može biti None
+Transaction = namedtuple('Transaction', (
+    'datum_tecajne_liste',
+    'valuta',
+    'iznos_valuta',
+    'iznos_kune',
+    'datum_vrijeme',
+    'serijski_broj',
+    'br_kartice',
+    'oznaka_platnog',
+    'primjenjeni_tecaj',
+    'prodaoime',
+    'prodaodok',
+    'provbanke',
+    'korisnik_ime',
+    'idblag',
+    'id_bt',
+))
+
+
+# ═══════════════════════════════════════════════════════════
+# FIREBIRD FUNKCIJE
+# ═══════════════════════════════════════════════════════════
+
+def get_uniqueid():
+    """
+    Dohvaća UNIQUEID iz tablice FIRME.
+    Greške se prosljeđuju pozivatelju.
+    Vraća: string (UNIQUEID) ili None
+    """
+    cache = get_statement_cache()
+    
+    sql = 'SELECT FIRST 1 UNIQUEID FROM FIRME ORDER BY IDFIRME DESC'
+    cur = cache.execute(sql)
+    row = cur.fetchone()
+    
+    if row:
+        return row[0]
+    return None
+
+
+def get_idblag_index(start_str, end_str, cache=None):
+    """
+    Dohvaća sve parove (TL_DATUM_TECAJNE_LISTE, IDBLAG) iz tablice BLAGAJNA
+    za cijeli raspon datuma jednim upitom. Greške se prosljeđuju pozivatelju
+    (izgubljena veza ne smije dati prazan "uspješan" export).
+    
+    Parametri:
+        start_str: string u formatu 'YYYY-MM-DD'
+        end_str: string u formatu 'YYYY-MM-DD'
+        cache: StatementCache konekcije (default globalna konekcija)
+    
+    Vraća:
+        lista (datum, IDBLAG) sortirana po datumu, jedan IDBLAG po datumu
+    """
+    cache = cache or get_statement_cache()
+    
+    sql = '''
+        SELECT 
+            TL_DATUM_TECAJNE_LISTE,
+            IDBLAG
+        FROM BLAGAJNA 
+        WHERE TL_DATUM_TECAJNE_LISTE BETWEEN ? AND ?
+        ORDER BY TL_DATUM_TECAJNE_LISTE, IDBLAG
+    '''
+    
+    cur = cache.execute(sql, (parse_date(start_str), parse_date(end_str)))
+    rows = cur.fetchall()
+    
+    # Za svaki datum uzima se samo jedan IDBLAG (najmanji)
+    index = []
+    for row in rows:
+        if index and index[-1][0] == row[0]:
+            continue
+        index.append((row[0], row[1]))
+    
+    return index
+
+
+def get_blagajna_stanje(id_blag, cache=None):
+    """
+    Dohvaća sve slogove iz BLAGAJNA_STANJE za zadani IDBLAG.
+    Greške se prosljeđuju pozivatelju.
+    
+    Parametri:
+        id_blag: int
+        cache: StatementCache konekcije (default globalna konekcija)
+    
+    Vraća:
+        lista StanjeRow objekata ili []
+    """
+    cache = cache or get_statement_cache()
+    
+    sql = '''
+        SELECT 
+            bs.VALUTA_BROJCANO,
+            bs.IZNOS,
+            v.PROV_ZA_BANKU
+        FROM BLAGAJNA_STANJE bs
+        LEFT JOIN VALUTE v ON bs.VALUTA_BROJCANO = v.VALUTA_BROJCANO
+        WHERE bs.IDBLAG = ?
+        ORDER BY bs.VALUTA_BROJCANO
+    '''
+    
+    cur = cache.execute(sql, (id_blag,))
+    rows = cur.fetchall()
+    
+    return [StanjeRow(row[0], row[1], row[2] if row[2] else 0) for row in rows]
+
+
+# Pretvara slog iz BLAGAJNICKE_TRANSAKCIJE upita (stupci redom kao Transaction)
+_transaction_from_row = Transaction._make
+
+
+def iter_transactions_for_range(start_str, end_str, idblag_index, fetch_size=500, cache=None):
+    """
+    Dohvaća transakcije za cijeli raspon datuma jednim upitom i vraća ih
+    grupirane po danu (IDBLAG), redom kojim su dani u idblag_index.
+    
+    Slogovi se čitaju s fetchmany(fetch_size), pa se cijeli rezultat nikad
+    ne drži u memoriji - u memoriji je samo grupa jednog dana. Greške pri
+    čitanju se propagiraju pozivatelju (nema tihog skraćivanja exporta).
+    
+    Parametri:
+        start_str: string u formatu 'YYYY-MM-DD'
+        end_str: string u formatu 'YYYY-MM-DD'
+        idblag_index: lista (datum, IDBLAG) iz get_idblag_index
+        fetch_size: broj slogova po fetchmany pozivu
+        cache: StatementCache konekcije (default globalna konekcija)
+    
+    Vraća:
+        generator (IDBLAG, lista Transaction objekata) - samo za dane s transakcijama
+    """
+    cache = cache or get_statement_cache()
+    
+    wanted = set(id_blag for datum, id_blag in idblag_index)
+    if not wanted:
+        return
+    
+    sql = '''
+        SELECT 
+            bt.TEC_TL_DATUM_TECAJNE_LISTE,
+            bt.TEC_VALUTA_BROJCANO,
+            bt.IZNOS_U_VALUTI,
+            bt.IZNOS_U_KUNAMA,
+            bt.DATUM_I_VRIJEME_TRANSAKCIJE,
+            bt.SERIJSKI_BROJ,
+            bt.BR_KARTICE,
+            bt.OZNAKA_PLATNOG_INSTRUMENTA_U_K,
+            bt.PRIMJENJENI_TECAJ,
+            bt.PRODAOIME,
+            bt.PRODAODOK,
+            v.PROVBANKE,
+            k.IME,
+            bt.IDBLAG,
+            bt.ID_BT
+        FROM BLAGAJNICKE_TRANSAKCIJE bt
+        JOIN BLAGAJNA b ON bt.IDBLAG = b.IDBLAG
+        LEFT JOIN VALUTE v ON bt.TEC_VALUTA_BROJCANO = v.VALUTA_BROJCANO
+        LEFT JOIN KORISNICI k ON bt.SISUSER = k.IDKOR
+        WHERE b.TL_DATUM_TECAJNE_LISTE BETWEEN ? AND ?
+        ORDER BY b.TL_DATUM_TECAJNE_LISTE, bt.IDBLAG, bt.ID_BT
+    '''
+    
+    cur = cache.execute(sql, (parse_date(start_str), parse_date(end_str)))
+    cur.arraysize = fetch_size
+    
+    current_id = None
+    group = []
+    
+    while True:
+        rows = cur.fetchmany(fetch_size)
+        if not rows:
+            break
+        
+        for row in rows:
+            id_blag = row[13]
+            
+            # Dodatni BLAGAJNA slogovi za isti datum nisu u indeksu
+            if id_blag not in wanted:
+                continue
+            
+            if id_blag != current_id:
+                if current_id is not None:
+                    yield current_id, group
+                current_id = id_blag
+                group = []
+            
+            group.append(_transaction_from_row(row))
+    
+    if current_id is not None:
+        yield current_id, group
+
+
+# ═══════════════════════════════════════════════════════════
+# TEČAJNA LISTA
+# ═══════════════════════════════════════════════════════════
+
+class RateIndex:
+    """
+    Kupovni tečajevi ('RED') po valuti, sortirani po datumu.
+    
+    Učitava se jednom za cijeli raspon exporta (load_rate_index), a tečaj za
+    (valuta, datum) se traži binarnim pretraživanjem (bisect) bez upita na
+    bazu. Ako za datum nema tečaja (ili je 0/NULL):
+        fallback='default'    -> 1.0 (dosadašnje ponašanje)
+        fallback='last_known' -> zadnji poznati tečaj prije tog datuma
+                                 (1.0 samo ako ga nema ni u povijesti)
+    Svaki zamjenski tečaj se bilježi u missing, pa nije "tih".
+    """
+    
+    def __init__(self, fallback='default'):
+        self.fallback = fallback
+        self._dates = {}
+        self._rates = {}
+        self._memo = {}
+        self.covered_from = None
+        self.covered_to = None
+        self.exact_hits = 0
+        self.last_known_hits = 0
+        self.default_hits = 0
+        self.queries = 0
+        self.missing = set()
+    
+    def add(self, valuta, datum, tecaj):
+        """Dodaje tečaj; 0/NULL tečajevi se ne pamte (tretiraju se kao da ih nema)."""
+        if not tecaj:
+            return
+        dates = self._dates.setdefault(valuta, [])
+        rates = self._rates.setdefault(valuta, [])
+        i = bisect.bisect_left(dates, datum)
+        if i < len(dates) and dates[i] == datum:
+            rates[i] = float(tecaj)
+        else:
+            dates.insert(i, datum)
+            rates.insert(i, float(tecaj))
+        self._memo.clear()
+    
+    def lookup(self, valuta, datum):
+        """
+        Vraća kupovni tečaj za valutu na datum (float).
+        """
+        key = (valuta, datum)
+        result = self._memo.get(key)
+        if result is None:
+            result = self._find(valuta, datum)
+            self._memo[key] = result
+        
+        tecaj, kind = result
+        if kind == 'exact':
+            self.exact_hits += 1
+        elif kind == 'last_known':
+            self.last_known_hits += 1
+            self.missing.add(key)
+        else:
+            self.default_hits += 1
+            self.missing.add(key)
+        return tecaj
+    
+    def _find(self, valuta, datum):
+        datum = _as_date(datum)
+        dates = self._dates.get(valuta)
+        if dates:
+            i = bisect.bisect_right(dates, datum)
+            if i and dates[i - 1] == datum:
+                return self._rates[valuta][i - 1], 'exact'
+            if i and self.fallback == 'last_known':
+                return self._rates[valuta][i - 1], 'last_known'
+        return 1.0, 'default'
+    
+    def last_rate_date(self):
+        """Vraća zadnji datum za koji indeks ima tečaj (bilo koje valute) ili None."""
+        return max((dates[-1] for dates in self._dates.values() if dates), default=None)
+    
+    def stats(self):
+        """
+        Vraća statistiku indeksa.
+        
+        Vraća:
+            dictionary {exact_hits, last_known_hits, default_hits, missing, queries}
+            missing je broj (valuta, datum) parova bez tečaja za taj datum
+        """
+        return {
+            'exact_hits': self.exact_hits,
+            'last_known_hits': self.last_known_hits,
+            'default_hits': self.default_hits,
+            'missing': len(self.missing),
+            'queries': self.queries
+        }
+    
+    def load_file(self, path):
+        """Učitava tečajeve spremljene prethodnim exportom (save_file)."""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for valuta, items in data['rates'].items():
+            for datum, tecaj in items:
+                self.add(valuta, parse_date(datum), tecaj)
+        self.covered_from = parse_date(data['covered_from'])
+        self.covered_to = parse_date(data['covered_to'])
+    
+    def save_file(self, path):
+        """Sprema tečajeve i pokriveni raspon (atomarno, tmp + os.replace)."""
+        data = {
+            'covered_from': self.covered_from.strftime('%Y-%m-%d'),
+            'covered_to': self.covered_to.strftime('%Y-%m-%d'),
+            'rates': {
+                valuta: [[d.strftime('%Y-%m-%d'), r] for d, r in zip(self._dates[valuta], self._rates[valuta])]
+                for valuta in self._dates
+            }
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+
+def _load_rates_between(index, start_date, end_date, cache):
+    """Dodaje u indeks sve 'RED' tečajeve između dva datuma (jedan upit)."""
+    sql = '''
+        SELECT VALUTA_BROJCANO, TL_DATUM_TECAJNE_LISTE, KUPOVNI_TECAJ
+        FROM TECAJEVI
+        WHERE TL_DATUM_TECAJNE_LISTE BETWEEN ? AND ?
+          AND VMT_VRSTA_TECAJA = 'RED'
+        ORDER BY VALUTA_BROJCANO, TL_DATUM_TECAJNE_LISTE
+    '''
+    cur = cache.execute(sql, (start_date, end_date))
+    index.queries += 1
+    for valuta, datum, tecaj in cur.fetchall():
+        index.add(valuta, _as_date(datum), tecaj)
+
+
+def _load_last_rates_before(index, start_date, cache):
+    """Dodaje u indeks zadnji 'RED' tečaj prije start_date za svaku valutu."""
+    sql = '''
+        SELECT t.VALUTA_BROJCANO, t.TL_DATUM_TECAJNE_LISTE, t.KUPOVNI_TECAJ
+        FROM TECAJEVI t
+        WHERE t.VMT_VRSTA_TECAJA = 'RED'
+          AND t.TL_DATUM_TECAJNE_LISTE = (
+              SELECT MAX(t2.TL_DATUM_TECAJNE_LISTE)
+              FROM TECAJEVI t2
+              WHERE t2.VALUTA_BROJCANO = t.VALUTA_BROJCANO
+                AND t2.VMT_VRSTA_TECAJA = 'RED'
+                AND t2.KUPOVNI_TECAJ <> 0
+                AND t2.TL_DATUM_TECAJNE_LISTE < ?
+          )
+    '''
+    cur = cache.execute(sql, (start_date,))
+    index.queries += 1
+    for valuta, datum, tecaj in cur.fetchall():
+        index.add(valuta, _as_date(datum), tecaj)
+
+
+def _as_date(value):
+    """TIMESTAMP/DATE iz baze -> datetime.date (datumi u indeksu se uspoređuju)."""
+    return value.date() if isinstance(value, datetime) else value
+
+
+def load_rate_index(start_date, end_date, cache=None, fallback=None, cache_file=None):
+    """
+    Učitava indeks tečajeva za raspon exporta.
+    
+    Ako je zadan cache_file ([EXPORT] rate_cache_file), tečajevi iz prethodnih
+    exporta se čitaju s diska i iz baze se dohvaća samo dio raspona koji nije
+    pokriven. Pokriveni raspon završava zadnjim danom koji stvarno ima
+    tečajeve (najkasnije danas), pa se dani za koje tečajna lista još nije
+    postojala čitaju ponovo. I zadnji pokriveni dan se uvijek ponovo čita jer
+    tečajna lista za taj dan možda još nije bila potpuna. Uz
+    fallback='last_known' dohvaća se i zadnji tečaj prije početka raspona.
+    
+    Parametri:
+        start_date: datetime.date objekt
+        end_date: datetime.date objekt
+        cache: StatementCache konekcije (default globalna konekcija)
+        fallback: 'default' ili 'last_known' (default [EXPORT] rate_fallback)
+        cache_file: putanja do JSON datoteke ili None (default [EXPORT] rate_cache_file)
+    
+    Vraća:
+        RateIndex objekt
+    """
+    global rate_index
+    cache = cache or get_statement_cache()
+    if fallback is None:
+        fallback = EXPORT_CONFIG['rate_fallback']
+    if cache_file is None:
+        cache_file = EXPORT_CONFIG['rate_cache_file']
+    
+    index = RateIndex(fallback)
+    if cache_file and os.path.exists(cache_file):
+        try:
+            index.load_file(cache_file)
+        except (ValueError, KeyError):
+            index = RateIndex(fallback)
+    
+    if index.covered_from is None:
+        _load_rates_between(index, start_date, end_date, cache)
+        index.covered_from, index.covered_to = start_date, end_date
+    else:
+        if start_date < index.covered_from:
+            _load_rates_between(index, start_date, index.covered_from, cache)
+            index.covered_from = start_date
+        if end_date >= index.covered_to:
+            _load_rates_between(index, index.covered_to, end_date, cache)
+            index.covered_to = end_date
+    
+    # Dani nakon zadnje tečajne liste (i budući dani) nisu pokriveni
+    last_rate_date = index.last_rate_date()
+    covered_to = min(index.covered_to, datetime.now().date())
+    if last_rate_date is not None:
+        covered_to = min(covered_to, last_rate_date)
+    index.covered_to = max(index.covered_from, covered_to)
+    
+    if fallback == 'last_known':
+        _load_last_rates_before(index, start_date, cache)
+    
+    if cache_file:
+        index.save_file(cache_file)
+    
+    rate_index = index
+    return index
+
+
+def get_rate_index_stats():
+    """
+    Vraća statistiku indeksa tečajeva zadnjeg exporta ili None.
+    Vraća: dictionary (vidi RateIndex.stats)
+    """
+    return rate_index.stats() if rate_index is not None else None
+
+
+# ═══════════════════════════════════════════════════════════
+# EKSTRAKCIJA PO DANIMA
+# ═══════════════════════════════════════════════════════════
+
+def iter_day_data(idblag_index, fetch_size=500, cache=None):
+    """
+    Dohvaća podatke za uzastopne dane iz idblag_index, dan po dan.
+    
+    Parametri:
+        idblag_index: lista (datum, IDBLAG) sortirana po datumu
+        fetch_size: broj slogova po fetchmany pozivu za transakcije
+        cache: StatementCache konekcije (default globalna konekcija)
+    
+    Vraća:
+        generator (datum, stanje_rows, transactions) redom po danima
+    """
+    if not idblag_index:
+        return
+    
+    start_str = idblag_index[0][0].strftime('%Y-%m-%d')
+    end_str = idblag_index[-1][0].strftime('%Y-%m-%d')
+    
+    # Jedan upit za transakcije cijelog raspona, grupe stižu redom po danima
+    transaction_groups = iter_transactions_for_range(
+        start_str, end_str, idblag_index, fetch_size, cache
+    )
+    next_group = next(transaction_groups, None)
+    
+    for datum, id_blag in idblag_index:
+        stanje_rows = get_blagajna_stanje(id_blag, cache)
+        
+        if next_group is not None and next_group[0] == id_blag:
+            transactions = next_group[1]
+            next_group = next(transaction_groups, None)
+        else:
+            transactions = []
+        
+        yield datum, stanje_rows, transactions
+
+
+def iter_day_data_parallel(idblag_index, workers, shard_days=7, fetch_size=500):
+    """
+    Isto kao iter_day_data, ali dane dijeli u blokove (shard_days uzastopnih
+    dana) koje paralelno dohvaća workers niti, svaka sa svojom konekcijom iz
+    ConnectionPool-a. Dani se vraćaju u originalnom redoslijedu.
+    
+    U memoriji je najviše 2 * workers blokova, bez obzira na raspon datuma.
+    
+    Parametri:
+        idblag_index: lista (datum, IDBLAG) sortirana po datumu
+        workers: broj paralelnih niti/konekcija
+        shard_days: broj dana u jednom bloku
+        fetch_size: broj slogova po fetchmany pozivu za transakcije
+    
+    Vraća:
+        generator (datum, stanje_rows, transactions) redom po danima
+    """
+    pool = get_connection_pool(workers)
+    
+    shards = iter([
+        idblag_index[i:i + shard_days]
+        for i in range(0, len(idblag_index), shard_days)
+    ])
+    
+    def extract_shard(shard):
+        with pool.connection() as cache:
+            return list(iter_day_data(shard, fetch_size, cache))
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        try:
+            for shard in shards:
+                pending.append(executor.submit(extract_shard, shard))
+                if len(pending) >= 2 * workers:
+                    break
+            
+            while pending:
+                days = pending.popleft().result()
+                
+                shard = next(shards, None)
+                if shard is not None:
+                    pending.append(executor.submit(extract_shard, shard))
+                
+                for day in days:
+                    yield day
+        finally:
+            # Prekid/greška: blokovi koji još nisu počeli se ne dohvaćaju
+            for future in pending:
+                future.cancel()
+
+
+# ═══════════════════════════════════════════════════════════
+# XML STREAMING WRITER
+# ═══════════════════════════════════════════════════════════
+
+# Prazni elementi koji se pišu kao <tag></tag> umjesto <tag />
+FULL_CLOSE_TAGS = ('honnan_hova', 'vevo_kod', 'vevo_cim', 'vevo_utlevel_id', 'vevo_orszag')
+
+# Tekstualna polja (unos blagajnika) u kojima se escapiraju i CROATIAN_CHARS
+TEXT_TAGS = ('felhasznalo', 'dokumentumszam', 'fiz_mod', 'vevo_kod', 'vevo_utlevel_id')
+
+def escape_xml_text(text):
+    """
+    Escapira XML specijalne znakove u tekstu elementa (isto kao ElementTree).
+    
+    Parametri:
+        text: string
+    
+    Vraća:
+        escapirani string
+    """
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text
+
+
+def make_text_char_refs(text_escaping='legacy'):
+    """
+    Vraća parove (znak, referenca) za escapiranje CROATIAN_CHARS u
+    tekstualnim poljima (nakon escape_xml_text).
+    
+    Parametri:
+        text_escaping:
+            'legacy'  -> Č se piše kao &amp;#x010C; (dosadašnji izlaz: &#x010C;
+                         iz zamjene znakova pa još jednom escapiran)
+            'charref' -> Č se piše kao &#x010C; (ispravna XML referenca)
+            'utf8'    -> Č se piše kao UTF-8 znak
+    
+    Vraća:
+        tuple parova, prazan za 'utf8'
+    """
+    if text_escaping == 'utf8':
+        return ()
+    return make_char_refs('&amp;#x' if text_escaping == 'legacy' else '&#x')
+
+
+def escape_xml_field(text, char_refs):
+    """
+    Escapira tekstualno polje: XML specijalni znakovi pa CROATIAN_CHARS
+    (u jednom pozivu, bez zasebnog prolaza za zamjenu znakova).
+    
+    Parametri:
+        text: string
+        char_refs: parovi iz make_text_char_refs()
+    
+    Vraća:
+        escapirani string
+    """
+    return replace_chars(escape_xml_text(text), char_refs)
+
+
+class XmlStreamWriter:
+    """
+    Inkrementalno piše tomeges_adatok XML u binarnu datoteku.
+    
+    Svaka grupa (valto_tetelek / kozonseges_tetelek) se zapisuje čim je
+    gotova, pa memorija ne raste s rasponom datuma. Izlaz je bajt-identičan
+    onome što daju ET.indent(space="  ") + tree.write(encoding='UTF-8',
+    xml_declaration=True), uključujući prevođenje novih redova u os.linesep
+    kao kod tekstualnog moda.
+    
+    Prazni elementi iz full_close_tags pišu se odmah kao <tag></tag>, pa
+    nema naknadnog čitanja i prepisivanja datoteke.
+    
+    Uz indent=None piše se kompaktni XML bez razmaka i novih redova između
+    elemenata (isto što i tree.write bez ET.indent).
+    
+    Tekst elemenata iz text_tags escapira se prema text_escaping (vidi
+    make_text_char_refs), a ostalih elemenata samo escape_xml_text.
+    """
+    
+    def __init__(self, fp, root_tag='tomeges_adatok', indent='  ', full_close_tags=FULL_CLOSE_TAGS,
+                 text_tags=TEXT_TAGS, text_escaping='legacy'):
+        self.fp = fp
+        self.root_tag = root_tag
+        self.indent = indent
+        self.full_close_tags = frozenset(full_close_tags)
+        self.text_tags = frozenset(text_tags)
+        self.text_char_refs = make_text_char_refs(text_escaping)
+        if indent is None:
+            self.group_indent = self.item_indent = self.field_indent = ''
+        else:
+            self.group_indent = '\n' + indent
+            self.item_indent = self.group_indent + indent
+            self.field_indent = self.item_indent + indent
+        self.bytes_written = 0
+        self._root_open = False
+        self._write("<?xml version='1.0' encoding='UTF-8'?>\n")
+    
+    def _write(self, text):
+        if os.linesep != '\n':
+            text = text.replace('\n', os.linesep)
+        data = text.encode('UTF-8', 'xmlcharrefreplace')
+        self.fp.write(data)
+        self.bytes_written += len(data)
+    
+    def write_group(self, group_tag, item_tag, items):
+        """
+        Zapisuje jednu grupu elemenata.
+        
+        Parametri:
+            group_tag: naziv grupe (npr. 'valto_tetelek')
+            item_tag: naziv stavke (npr. 'valto_tetel')
+            items: lista stavki, svaka stavka je lista (tag, tekst) parova
+        """
+        ind1, ind2, ind3 = self.group_indent, self.item_indent, self.field_indent
+        full_close_tags = self.full_close_tags
+        text_tags = self.text_tags
+        text_char_refs = self.text_char_refs
+        
+        parts = []
+        if not self._root_open:
+            parts.append(f'<{self.root_tag}>')
+            self._root_open = True
+        
+        if not items:
+            parts.append(f'{ind1}<{group_tag} />')
+            self._write(''.join(parts))
+            return
+        
+        parts.append(f'{ind1}<{group_tag}>')
+        for fields in items:
+            parts.append(f'{ind2}<{item_tag}>')
+            for tag, text in fields:
+                if text:
+                    if tag in text_tags:
+                        text = escape_xml_field(text, text_char_refs)
+                    else:
+                        text = escape_xml_text(text)
+                    parts.append(f'{ind3}<{tag}>{text}</{tag}>')
+                elif tag in full_close_tags:
+                    parts.append(f'{ind3}<{tag}></{tag}>')
+                else:
+                    parts.append(f'{ind3}<{tag} />')
+            parts.append(f'{ind2}</{item_tag}>')
+        parts.append(f'{ind1}</{group_tag}>')
+        
+        self._write(''.join(parts))
+    
+    def element(self, tag, text):
+        """
+        Renderira jedan element stavke (s uvlakom) isto kao write_group.
+        
+        Parametri:
+            tag: naziv elementa
+            text: neescapirani tekst ('' za prazan element)
+        
+        Vraća:
+            string
+        """
+        ind3 = self.field_indent
+        if text:
+            if tag in self.text_tags:
+                text = escape_xml_field(text, self.text_char_refs)
+            else:
+                text = escape_xml_text(text)
+            return f'{ind3}<{tag}>{text}</{tag}>'
+        if tag in self.full_close_tags:
+            return f'{ind3}<{tag}></{tag}>'
+        return f'{ind3}<{tag} />'
+    
+    def write_rendered_group(self, group_tag, rendered_items):
+        """
+        Zapisuje grupu čije su stavke već renderirane (npr. funkcijom iz
+        compile_kozonseges_formatter) - svaka stavka je string s uvlakom.
+        """
+        ind1 = self.group_indent
+        
+        parts = []
+        if not self._root_open:
+            parts.append(f'<{self.root_tag}>')
+            self._root_open = True
+        
+        if not rendered_items:
+            parts.append(f'{ind1}<{group_tag} />')
+        else:
+            parts.append(f'{ind1}<{group_tag}>')
+            parts.extend(rendered_items)
+            parts.append(f'{ind1}</{group_tag}>')
+        
+        self._write(''.join(parts))
+    
+    def close(self):
+        """Zatvara korijenski element."""
+        if self._root_open:
+            newline = '' if self.indent is None else '\n'
+            self._write(f'{newline}</{self.root_tag}>')
+        else:
+            self._write(f'<{self.root_tag} />')
+
+
+# ═══════════════════════════════════════════════════════════
+# FORMATIRANJE STAVKI
+# ═══════════════════════════════════════════════════════════
+
+# Polja stavke kozonseges_tetel, redom kojim se pišu
+KOZONSEGES_TAGS = (
+    'nbr', 'datum', 'valto', 'felhasznalo', 'tranzakcio', 'dokumentumszam', 'valuta',
+    'fiz_mod', 'ertek', 'akt_arf', 'alap_arf', 'bank_arf', 'honnan_hova', 'vevo_kod',
+    'vevo_cim', 'vevo_utlevel_id', 'vevo_orszag',
+)
+
+# Najveći broj vrijednosti koje prevedeni formatter pamti po polju
+FORMATTER_MEMO_LIMIT = 10000
+
+
+def kozonseges_fields(t, nbr, valto_text, alap_arf_tecaj, amount_text=float_amount_text):
+    """
+    Polja stavke kozonseges_tetel kao lista (tag, tekst) parova
+    (za XmlStreamWriter.write_group; [EXPORT] row_formatter=generic).
+    
+    Parametri:
+        t: Transaction
+        nbr: redni broj stavke u danu
+        valto_text: str(valto_nbr)
+        alap_arf_tecaj: kupovni tečaj valute transakcije (RateIndex.lookup)
+        amount_text: formatiranje iznosa (vidi MONEY_FORMATTERS)
+    
+    Vraća:
+        lista (tag, tekst) parova redom kao KOZONSEGES_TAGS
+    """
+    if isinstance(t.datum_vrijeme, datetime):
+        datum_text = t.datum_vrijeme.strftime('%Y-%m-%d %H:%M:%S')
+    else:
+        datum_text = str(t.datum_vrijeme)
+    
+    vevo_orszag_value = 'N' if t.prodaodok and 'BIH' not in str(t.prodaodok).upper() else ''
+    
+    return [
+        ('nbr', str(nbr)),
+        ('datum', datum_text),
+        ('valto', valto_text),
+        ('felhasznalo', field_text(t.korisnik_ime)),
+        ('tranzakcio', str(t.serijski_broj) if t.serijski_broj else ''),
+        ('dokumentumszam', field_text(t.br_kartice)),
+        ('valuta', str(t.valuta) if t.valuta else ''),
+        ('fiz_mod', field_text(t.oznaka_platnog)),
+        ('ertek', amount_text(t.iznos_valuta) if t.iznos_valuta else '0.00'),
+        ('akt_arf', str(t.primjenjeni_tecaj) if t.primjenjeni_tecaj else ''),
+        ('alap_arf', str(alap_arf_tecaj) if alap_arf_tecaj else ''),
+        ('bank_arf', amount_text(t.provbanke) if t.provbanke else '0.00'),
+        ('honnan_hova', ''),
+        ('vevo_kod', field_text(t.prodaoime)),
+        ('vevo_cim', ''),
+        ('vevo_utlevel_id', field_text(t.prodaodok)),
+        ('vevo_orszag', vevo_orszag_value),
+    ]
+
+
+def compile_kozonseges_formatter(writer, valto_nbr, amount_text=float_amount_text):
+    """
+    Prevodi formatter stavki kozonseges_tetel za jedan export.
+    
+    Sve što je isto za svaku stavku (tagovi, uvlake, valto, uvijek prazni
+    elementi) renderira se jednom u predložak, a po transakciji se upisuju
+    samo varijabilna polja. Elementi polja s malo različitih vrijednosti
+    (korisnik, valuta, način plaćanja, tečaj, provizija) pamte se po
+    vrijednosti, pa se ne escapiraju i ne formatiraju ponovo. Izlaz je isti
+    kao writer.write_group s kozonseges_fields().
+    
+    Parametri:
+        writer: XmlStreamWriter u koji se piše (uvlake, escapiranje, prazni tagovi)
+        valto_nbr: string (UNIQUEID iz FIRME)
+        amount_text: formatiranje iznosa (vidi MONEY_FORMATTERS)
+    
+    Vraća:
+        funkcija format_row(t, nbr, alap_arf_tecaj) -> string stavke
+        (za writer.write_rendered_group)
+    """
+    element = writer.element
+    ind3 = writer.field_indent
+    
+    # Polja koja nikad nisu prazna idu u predložak s otvorenim/zatvorenim tagom
+    always_filled = ('nbr', 'ertek', 'bank_arf')
+    constants = {
+        'valto': element('valto', str(valto_nbr)).replace('%', '%%'),
+        'honnan_hova': element('honnan_hova', ''),
+        'vevo_cim': element('vevo_cim', ''),
+    }
+    
+    template = [f'{writer.item_indent}<kozonseges_tetel>']
+    for tag in KOZONSEGES_TAGS:
+        if tag in constants:
+            template.append(constants[tag])
+        elif tag in always_filled:
+            template.append(f'{ind3}<{tag}>%s</{tag}>')
+        else:
+            template.append('%s')
+    template.append(f'{writer.item_indent}</kozonseges_tetel>')
+    template = ''.join(template)
+    
+    def escape_plain(value):
+        value = str(value)
+        if '&' in value or '<' in value or '>' in value:
+            return escape_xml_text(value)
+        return value
+    
+    char_refs = writer.text_char_refs
+    
+    def escape_text(value):
+        value = str(value)
+        if value.isascii():
+            if '&' in value or '<' in value or '>' in value:
+                return escape_xml_text(value)
+            return value
+        return escape_xml_field(value, char_refs)
+    
+    def parts(tag):
+        """(otvoreni tag, zatvoreni tag, prazan element, funkcija za escapiranje)"""
+        escape = escape_text if tag in writer.text_tags else escape_plain
+        return f'{ind3}<{tag}>', f'</{tag}>', element(tag, ''), escape
+    
+    datum_open, datum_close, _, _ = parts('datum')
+    tranzakcio_open, tranzakcio_close, tranzakcio_empty, tranzakcio_escape = parts('tranzakcio')
+    dokumentumszam_open, dokumentumszam_close, dokumentumszam_empty, dokumentumszam_escape = parts('dokumentumszam')
+    akt_arf_open, akt_arf_close, akt_arf_empty, akt_arf_escape = parts('akt_arf')
+    vevo_kod_open, vevo_kod_close, vevo_kod_empty, vevo_kod_escape = parts('vevo_kod')
+    vevo_utlevel_id_open, vevo_utlevel_id_close, vevo_utlevel_id_empty, vevo_utlevel_id_escape = parts('vevo_utlevel_id')
+    vevo_orszag_n = element('vevo_orszag', 'N')
+    vevo_orszag_empty = element('vevo_orszag', '')
+    
+    memo_felhasznalo = {}
+    memo_valuta = {}
+    memo_fiz_mod = {}
+    memo_alap_arf = {}
+    memo_bank_arf = {}
+    
+    def remember(memo, tag, value):
+        rendered = element(tag, str(value) if value else '')
+        if len(memo) < FORMATTER_MEMO_LIMIT:
+            memo[value] = rendered
+        return rendered
+    
+    def remember_bank_arf(value):
+        text = amount_text(value) if value else '0.00'
+        if len(memo_bank_arf) < FORMATTER_MEMO_LIMIT:
+            memo_bank_arf[value] = text
+        return text
+    
+    def format_row(t, nbr, alap_arf_tecaj):
+        datum_vrijeme = t.datum_vrijeme
+        if isinstance(datum_vrijeme, datetime):
+            datum = datum_open + datum_vrijeme.isoformat(' ', 'seconds') + datum_close
+        else:
+            datum = element('datum', str(datum_vrijeme))
+        
+        tranzakcio = t.serijski_broj
+        dokumentumszam = t.br_kartice
+        iznos_valuta = t.iznos_valuta
+        akt_arf = t.primjenjeni_tecaj
+        vevo_kod = t.prodaoime
+        vevo_utlevel_id = t.prodaodok
+        
+        return template % (
+            nbr,
+            datum,
+            memo_felhasznalo.get(t.korisnik_ime) or remember(memo_felhasznalo, 'felhasznalo', t.korisnik_ime),
+            (tranzakcio_open + tranzakcio_escape(tranzakcio) + tranzakcio_close
+             if tranzakcio else tranzakcio_empty),
+            (dokumentumszam_open + dokumentumszam_escape(dokumentumszam) + dokumentumszam_close
+             if dokumentumszam else dokumentumszam_empty),
+            memo_valuta.get(t.valuta) or remember(memo_valuta, 'valuta', t.valuta),
+            memo_fiz_mod.get(t.oznaka_platnog) or remember(memo_fiz_mod, 'fiz_mod', t.oznaka_platnog),
+            amount_text(iznos_valuta) if iznos_valuta else '0.00',
+            akt_arf_open + akt_arf_escape(akt_arf) + akt_arf_close if akt_arf else akt_arf_empty,
+            memo_alap_arf.get(alap_arf_tecaj) or remember(memo_alap_arf, 'alap_arf', alap_arf_tecaj),
+            memo_bank_arf.get(t.provbanke) or remember_bank_arf(t.provbanke),
+            vevo_kod_open + vevo_kod_escape(vevo_kod) + vevo_kod_close if vevo_kod else vevo_kod_empty,
+            (vevo_utlevel_id_open + vevo_utlevel_id_escape(vevo_utlevel_id) + vevo_utlevel_id_close
+             if vevo_utlevel_id else vevo_utlevel_id_empty),
+            (vevo_orszag_n if vevo_utlevel_id and 'BIH' not in str(vevo_utlevel_id).upper()
+             else vevo_orszag_empty),
+        )
+    
+    return format_row
+
+
+# ═══════════════════════════════════════════════════════════
+# IZLAZNI FORMATI
+# ═══════════════════════════════════════════════════════════
+
+# Nastavak koji se dodaje na naziv .XML datoteke za svaku kompresiju
+COMPRESSION_EXTENSIONS = {
+    'none': '',
+    'gzip': '.gz',
+    'zip': '.zip',
+}
+
+
+@contextmanager
+def compressed_output(fp, xml_name, compression='none'):
+    """
+    Omata binarni file-like objekt fp kompresijom, bez privremene datoteke.
+    
+    Kompresija se radi u hodu dok se XML piše, pa nema drugog prolaza kroz
+    datoteku. zipfile podržava pisanje u objekte bez seek(), pa radi i
+    preko BoundedPipe kod export_and_send.
+    
+    Parametri:
+        fp: objekt s write(bytes) metodom
+        xml_name: naziv XML datoteke (zapisuje se u gzip zaglavlje / zip arhivu)
+        compression: 'none', 'gzip' ili 'zip'
+    
+    Vraća (yield):
+        objekt u koji se piše nekomprimirani XML
+    """
+    if compression == 'gzip':
+        with gzip.GzipFile(filename=xml_name, mode='wb', fileobj=fp) as gz:
+            yield gz
+    elif compression == 'zip':
+        with zipfile.ZipFile(fp, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            with archive.open(xml_name, 'w') as member:
+                yield member
+    else:
+        yield fp
+
+
+# ═══════════════════════════════════════════════════════════
+# INKREMENTALNI EXPORT
+# ═══════════════════════════════════════════════════════════
+
+class ExportWatermark:
+    """
+    Dokle je poslovnica već exportana: zadnji exportani dan, najveći ID_BT
+    po IDBLAG i broj transakcija (nbr) zapisanih za zadnji dan.
+    
+    write_xml ga pomiče nakon svakog zapisanog dana; sprema se tek kad je
+    export uspješno završen (save_watermark).
+    """
+    
+    def __init__(self, last_date=None, max_id_bt=None, last_date_rows=0):
+        self.last_date = last_date
+        self.max_id_bt = dict(max_id_bt or {})
+        self.last_date_rows = last_date_rows
+    
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            parse_date(data['last_date']) if data.get('last_date') else None,
+            {int(id_blag): id_bt for id_blag, id_bt in data.get('max_id_bt', {}).items()},
+            data.get('last_date_rows', 0)
+        )
+    
+    def to_dict(self):
+        return {
+            'last_date': self.last_date.strftime('%Y-%m-%d') if self.last_date else None,
+            'max_id_bt': {str(id_blag): id_bt for id_blag, id_bt in self.max_id_bt.items()},
+            'last_date_rows': self.last_date_rows
+        }
+    
+    def is_new(self, datum, transaction):
+        """Da li transakcija nije obuhvaćena prethodnim exportom."""
+        if self.last_date is None or datum > self.last_date:
+            return True
+        if datum < self.last_date:
+            return False
+        return transaction.id_bt > self.max_id_bt.get(transaction.idblag, 0)
+    
+    def advance(self, datum, transactions):
+        """Bilježi da su transakcije za datum zapisane."""
+        if datum != self.last_date:
+            # Raniji dani se pri sljedećem exportu preskaču cijeli, pa je
+            # ID_BT potreban samo za IDBLAG zadnjeg dana
+            self.last_date = datum
+            self.last_date_rows = 0
+            self.max_id_bt = {}
+        self.last_date_rows += len(transactions)
+        for t in transactions:
+            if t.id_bt > self.max_id_bt.get(t.idblag, 0):
+                self.max_id_bt[t.idblag] = t.id_bt
+
+
+def _load_watermarks():
+    """Vraća cijeli sadržaj watermark datoteke (dictionary po valto_nbr)."""
+    path = EXPORT_CONFIG['watermark_file']
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_watermark(valto_nbr):
+    """
+    Učitava watermark poslovnice iz [EXPORT] watermark_file.
+    Vraća: ExportWatermark (prazan ako poslovnica još nije exportana)
+    """
+    data = _load_watermarks().get(str(valto_nbr))
+    return ExportWatermark.from_dict(data) if data else ExportWatermark()
+
+
+def save_watermark(valto_nbr, watermark):
+    """
+    Sprema watermark poslovnice (atomarno, tmp datoteka + os.replace).
+    Watermark se ne vraća unatrag: ako je postojeći noviji (npr. nakon punog
+    re-exporta starijeg raspona), ostaje postojeći.
+    """
+    if watermark.last_date is None:
+        return
+    
+    watermarks = _load_watermarks()
+    existing = watermarks.get(str(valto_nbr))
+    if existing and existing.get('last_date') and parse_date(existing['last_date']) > watermark.last_date:
+        return
+    
+    watermarks[str(valto_nbr)] = watermark.to_dict()
+    
+    path = EXPORT_CONFIG['watermark_file']
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# ═══════════════════════════════════════════════════════════
+# METRIKE EXPORTA
+# ═══════════════════════════════════════════════════════════
+
+# Faze exporta redom kojim se ispisuju (ključ u logu -> naziv u statusu)
+METRICS_PHASES = (
+    ('baza', 'baza'),
+    ('tecajevi', 'tečajevi'),
+    ('xml', 'XML'),
+    ('cekanje_ftp', 'čekanje FTP-a'),
+    ('upload', 'upload'),
+)
+
+_END = object()
+
+
+class ExportMetrics:
+    """
+    Mjerenja jednog exporta ili slanja ([EXPORT] metrics=1 ili history=1).
+    
+    Bilježi trajanje po fazama (METRICS_PHASES), broj SQL upita, dohvaćenih
+    slogova i vrijeme u bazi (MeteredCursor), zapisane bajtove i brzinu
+    slanja. SQL brojače istovremeno javljaju i niti paralelnog dohvata, pa
+    su zaštićeni lockom.
+    """
+    
+    def __init__(self, operation, filename=None, valto_nbr=None, start_date=None, end_date=None):
+        self.operation = operation
+        self.filename = filename
+        self.valto_nbr = valto_nbr
+        self.start_date = start_date
+        self.end_date = end_date
+        self.days = 0
+        self.transactions = 0
+        self.started_at = datetime.now()
+        self.status = None
+        self.phases = {}
+        self.queries = 0
+        self.rows_fetched = 0
+        self.sql_seconds = 0.0
+        self.rows_written = 0
+        self.bytes_written = 0
+        self.output_bytes = None
+        self.upload_bytes = 0
+        self.total_seconds = 0.0
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+    
+    def add_sql(self, queries, rows, seconds):
+        """Dodaje SQL upite, dohvaćene slogove i vrijeme u bazi."""
+        with self._lock:
+            self.queries += queries
+            self.rows_fetched += rows
+            self.sql_seconds += seconds
+    
+    def add_time(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+    
+    @contextmanager
+    def phase(self, name):
+        """with metrics.phase('baza'): ... - dodaje trajanje bloka fazi."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+    
+    def timed_iter(self, phase, iterable):
+        """Prosljeđuje elemente iterable, a vrijeme čekanja na svaki dodaje fazi."""
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            item = next(iterator, _END)
+            self.add_time(phase, time.perf_counter() - started)
+            if item is _END:
+                return
+            yield item
+    
+    def finish_xml(self, seconds, rows_written, bytes_written, days=0, transactions=0):
+        """
+        Zaključuje write_xml: vrijeme koje nije čekanje na bazu, tečajeve ili
+        FTP (puni BoundedPipe kod export_and_send) je formatiranje, zapis i
+        kompresija XML-a.
+        """
+        waited = sum(self.phases.get(phase, 0.0) for phase in ('baza', 'tecajevi', 'cekanje_ftp'))
+        self.add_time('xml', max(0.0, seconds - waited))
+        self.rows_written += rows_written
+        self.bytes_written += bytes_written
+        self.days += days
+        self.transactions += transactions
+    
+    def upload_rate(self):
+        """Vraća brzinu slanja u bajtovima u sekundi ili None."""
+        seconds = self.phases.get('upload')
+        if not seconds or not self.upload_bytes:
+            return None
+        return self.upload_bytes / seconds
+    
+    def format_summary(self):
+        """Vraća sažetak u dva retka (status u GUI-u, cli.py -v)."""
+        phases = ', '.join(
+            f"{label} {self.phases[key]:.1f} s" for key, label in METRICS_PHASES if key in self.phases
+        )
+        lines = [f"Trajanje: {self.total_seconds:.1f} s ({phases})" if phases else
+                 f"Trajanje: {self.total_seconds:.1f} s"]
+        
+        details = []
+        if self.queries:
+            details.append(f"SQL: {self.queries} upita, {self.rows_fetched} slogova ({self.sql_seconds:.1f} s)")
+        if self.bytes_written:
+            details.append(f"XML: {self.rows_written} slogova, {self.bytes_written / 1024:.0f} KB")
+        upload_rate = self.upload_rate()
+        if upload_rate is not None:
+            details.append(f"upload: {self.upload_bytes / 1024:.0f} KB, {upload_rate / 1024:.0f} KB/s")
+        if details:
+            lines.append(', '.join(details))
+        return '\n'.join(lines)
+    
+    def log_line(self):
+        """Vraća jedan redak za metrics_log (razmakom odvojeni ključ=vrijednost)."""
+        fields = [
+            self.started_at.strftime('%Y-%m-%d %H:%M:%S'),
+            self.operation,
+            self.filename or '-',
+            f"status={self.status}",
+            f"ukupno={self.total_seconds:.3f}s",
+        ]
+        fields.extend(f"{key}={self.phases[key]:.3f}s" for key, label in METRICS_PHASES if key in self.phases)
+        fields.extend([
+            f"upiti={self.queries}",
+            f"dohvaceno={self.rows_fetched}",
+            f"sql={self.sql_seconds:.3f}s",
+            f"zapisano={self.rows_written}",
+            f"xml_bajtova={self.bytes_written}",
+        ])
+        if self.output_bytes is not None:
+            fields.append(f"izlaz_bajtova={self.output_bytes}")
+        upload_rate = self.upload_rate()
+        if upload_rate is not None:
+            fields.append(f"upload_bajtova={self.upload_bytes}")
+            fields.append(f"upload_Bps={upload_rate:.0f}")
+        return ' '.join(fields)
+
+
+class MeteredCursor:
+    """
+    Omotač kursora koji ExportMetrics javlja dohvaćene slogove i vrijeme
+    dohvaćanja. StatementCache ga vraća samo dok se export mjeri, inače se
+    koristi kursor bez omotača.
+    """
+    
+    def __init__(self, cur, metrics):
+        self.__dict__['_cur'] = cur
+        self.__dict__['_metrics'] = metrics
+    
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+    
+    def __setattr__(self, name, value):
+        setattr(self._cur, name, value)
+    
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cur.fetchone()
+        self._metrics.add_sql(0, row is not None, time.perf_counter() - started)
+        return row
+    
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cur.fetchall()
+        self._metrics.add_sql(0, len(rows), time.perf_counter() - started)
+        return rows
+    
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = self._cur.fetchmany() if size is None else self._cur.fetchmany(size)
+        self._metrics.add_sql(0, len(rows), time.perf_counter() - started)
+        return rows
+
+
+def metrics_phase(metrics, name):
+    """metrics.phase(name) ili prazan context manager ako se ne mjeri."""
+    return nullcontext() if metrics is None else metrics.phase(name)
+
+
+def begin_export_metrics(operation, filename=None, valto_nbr=None, start_date=None, end_date=None):
+    """
+    Počinje mjerenje exporta ako je uključen [EXPORT] metrics ili history.
+    Dok mjerenje traje, SQL upiti (StatementCache) se broje u njemu.
+    
+    Parametri:
+        operation: 'export', 'export_send' ili 'upload'
+        filename: naziv XML datoteke
+        valto_nbr: poslovnica (za povijest exporta)
+        start_date, end_date: traženi raspon datuma (datetime.date)
+    
+    Vraća:
+        ExportMetrics objekt ili None ako je mjerenje isključeno
+    """
+    global active_metrics
+    if not (EXPORT_CONFIG['metrics'] or EXPORT_CONFIG['history']):
+        return None
+    metrics = ExportMetrics(operation, filename, valto_nbr, start_date, end_date)
+    if operation != 'upload':
+        active_metrics = metrics
+    return metrics
+
+
+def end_export_metrics(metrics, status='ok'):
+    """
+    Završava mjerenje: dopisuje redak u [EXPORT] metrics_log (metrics=1),
+    slog u povijest exporta (history=1, run_history.py) i sprema mjerenje
+    za get_export_metrics(). Greška pri pisanju loga ili povijesti ne
+    prekida export.
+    
+    Parametri:
+        metrics: ExportMetrics iz begin_export_metrics (None se zanemaruje)
+        status: 'ok', 'greska' ili 'prekinuto'
+    """
+    global active_metrics, last_export_metrics
+    if metrics is None:
+        return
+    if active_metrics is metrics:
+        active_metrics = None
+    
+    metrics.total_seconds = time.perf_counter() - metrics._started
+    metrics.status = status
+    last_export_metrics = metrics
+    
+    log_path = EXPORT_CONFIG['metrics_log']
+    if EXPORT_CONFIG['metrics'] and log_path:
+        try:
+            with open(log_path, 'a', encoding='utf-8') as f:
+                f.write(metrics.log_line() + '\n')
+        except OSError as e:
+            pass
+    
+    history_path = EXPORT_CONFIG['history_file']
+    if EXPORT_CONFIG['history'] and history_path:
+        try:
+            record_run(history_path, metrics, APP_VERSION, export_source())
+        except (sqlite3.Error, OSError) as e:
+            pass
+
+
+def export_source():
+    """Vraća izvor podataka exporta: putanju do Firebird baze ili mirrora."""
+    if EXPORT_CONFIG['source'] == 'mirror':
+        return EXPORT_CONFIG['mirror_path']
+    return DB_CONFIG.get('database')
+
+
+def metrics_status(error):
+    """Status za end_export_metrics prema iznimci (None = uspjeh)."""
+    if error is None:
+        return 'ok'
+    if isinstance(error, NoNewData):
+        return 'bez_novih'
+    return 'prekinuto' if isinstance(error, ExportCancelled) else 'greska'
+
+
+def get_export_metrics():
+    """
+    Vraća mjerenja zadnjeg exporta ili slanja.
+    Vraća: ExportMetrics objekt ili None (mjerenje isključeno ili još nije bilo exporta)
+    """
+    return last_export_metrics
+
+
+# ═══════════════════════════════════════════════════════════
+# PROFILIRANJE
+# ═══════════════════════════════════════════════════════════
+
+# Broj okvira stoga koje tracemalloc pamti po alokaciji
+PROFILE_TRACEBACK_FRAMES = 5
+
+# Alokacije samog profilera i importa se ne ispisuju
+PROFILE_IGNORED_FILES = ('<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>',
+                         tracemalloc.__file__, cProfile.__file__)
+
+
+class ExportProfile:
+    """
+    cProfile i tracemalloc za jedan export ili slanje ([EXPORT] profile=1).
+    
+    cProfile mjeri nit koja je pozvala export (ovisno o verziji Pythona bez
+    niti paralelnog dohvata i niti slanja kod export_and_send), a
+    tracemalloc prati alokacije svih niti.
+    """
+    
+    def __init__(self, operation, top):
+        self.operation = operation
+        self.top = top
+        self.started_at = datetime.now()
+        self.profiler = cProfile.Profile()
+        self._owns_tracemalloc = not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start(PROFILE_TRACEBACK_FRAMES)
+        else:
+            tracemalloc.reset_peak()
+        try:
+            self.profiler.enable()
+        except BaseException:
+            self._stop_tracemalloc()
+            raise
+    
+    def _stop_tracemalloc(self):
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+    
+    def stop(self):
+        """
+        Zaustavlja mjerenje.
+        Vraća: (tracemalloc.Snapshot, trenutni bajtovi, vršni bajtovi)
+        """
+        self.profiler.disable()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in PROFILE_IGNORED_FILES]
+        )
+        current, peak = tracemalloc.get_traced_memory()
+        self._stop_tracemalloc()
+        return snapshot, current, peak
+    
+    def format_allocations(self, snapshot, current, peak, status):
+        """Vraća tekst s top N alokacija po retku koda."""
+        statistics = snapshot.statistics('lineno')
+        lines = [
+            f"{self.operation} {self.started_at.strftime('%Y-%m-%d %H:%M:%S')} status={status}",
+            f"praćeno: {current / 1024 / 1024:.1f} MB, vršno: {peak / 1024 / 1024:.1f} MB, "
+            f"živo na kraju: {sum(stat.size for stat in statistics) / 1024 / 1024:.1f} MB",
+            '',
+            f"Top {self.top} alokacija (živih na kraju exporta) po retku:",
+        ]
+        for number, stat in enumerate(statistics[:self.top], start=1):
+            frame = stat.traceback[0]
+            lines.append(f"{number:>3}. {frame.filename}:{frame.lineno}: "
+                         f"{stat.size / 1024:.1f} KB u {stat.count} blokova")
+        return '\n'.join(lines) + '\n'
+
+
+def profile_paths(operation, filename=None, output_dir=None):
+    """
+    Vraća putanje (.pstats, alokacije .txt) profila za export ili slanje
+    datoteke filename; bez naziva datoteke (npr. neuspjeli export) naziv
+    je profile_{operation}_{vrijeme}.
+    """
+    base = filename or f"profile_{operation}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    base = os.path.join(output_dir or XML_FOLDER, f"{base}.{operation}")
+    return f"{base}.pstats", f"{base}.alloc.txt"
+
+
+def begin_export_profile(operation):
+    """
+    Pokreće cProfile i tracemalloc ako je uključen [EXPORT] profile.
+    Ako je drugi profiler već aktivan (npr. istovremeni export i slanje),
+    ovaj export se ne profilira.
+    
+    Parametri:
+        operation: 'export', 'export_send' ili 'upload'
+    
+    Vraća:
+        ExportProfile objekt ili None
+    """
+    if not EXPORT_CONFIG['profile']:
+        return None
+    try:
+        return ExportProfile(operation, EXPORT_CONFIG['profile_top'])
+    except ValueError as e:
+        return None
+
+
+def end_export_profile(profile, filename=None, output_dir=None, status='ok'):
+    """
+    Zaustavlja profiliranje i zapisuje .pstats (python -m pstats, snakeviz)
+    i top N alokacija pored XML datoteke. Greška pri pisanju ne prekida
+    export.
+    
+    Parametri:
+        profile: ExportProfile iz begin_export_profile (None se zanemaruje)
+        filename: naziv XML datoteke (None = naziv po vremenu)
+        output_dir: folder za profil (default XML_FOLDER)
+        status: 'ok', 'greska' ili 'prekinuto'
+    """
+    if profile is None:
+        return
+    snapshot, current, peak = profile.stop()
+    
+    stats_path, allocations_path = profile_paths(profile.operation, filename, output_dir)
+    try:
+        folder = os.path.dirname(stats_path)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        profile.profiler.dump_stats(stats_path)
+        with open(allocations_path, 'w', encoding='utf-8') as f:
+            f.write(profile.format_allocations(snapshot, current, peak, status))
+    except OSError as e:
+        pass
+
+
+# ═══════════════════════════════════════════════════════════
+# XML GENERIRANJE
+# ═══════════════════════════════════════════════════════════
+
+class ExportCancelled(Exception):
+    """Korisnik je prekinuo export ili upload."""
+
+
+class NoNewData(Exception):
+    """Inkrementalni export nema novih podataka od zadnjeg exporta (datoteka se ne kreira)."""
+
+
+def make_xml_filename(valto_nbr):
+    """
+    Vraća naziv XML datoteke za poslovnicu i trenutno vrijeme.
+    Vraća: string (npr. "009_rpt_20260221_143022.XML")
+    """
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return f"{valto_nbr}_rpt_{timestamp}.XML"
+
+
+def output_filename(xml_name, compression='none'):
+    """
+    Vraća naziv datoteke koja se sprema/šalje za zadanu kompresiju.
+    Vraća: string (npr. "009_rpt_20260221_143022.XML.gz")
+    """
+    return xml_name + COMPRESSION_EXTENSIONS[compression]
+
+
+def write_xml(fp, valto_nbr, start_date, end_date, progress=None, cancel_event=None,
+              output_format=None, watermark=None):
+    """
+    Piše cijeli XML za raspon datuma u binarni file-like objekt fp
+    (datoteka, BoundedPipe, TeeWriter...). Svaki dan se zapisuje odmah nakon
+    obrade (XmlStreamWriter).
+    
+    Ako je u REPORT.INI [EXPORT] workers > 1, dani se dohvaćaju paralelno
+    (iter_day_data_parallel), a zapisuju se i dalje redom po datumu.
+    
+    Parametri:
+        fp: objekt s write(bytes) metodom
+        valto_nbr: string (UNIQUEID iz FIRME)
+        start_date: datetime.date objekt
+        end_date: datetime.date objekt
+        progress: opcionalna funkcija koja se poziva nakon svakog dana s
+                  dictionaryjem {day, days_done, days_total, rows_written, bytes_written}
+        cancel_event: opcionalni threading.Event - provjerava se između dana,
+                      ako je postavljen baca se ExportCancelled
+        output_format: 'indented' ili 'compact' (default [EXPORT] output_format)
+        watermark: opcionalni ExportWatermark - ako je zadan, export počinje od
+                   watermark.last_date; za taj dan se pišu samo nove transakcije
+                   (nbr se nastavlja, bez valto_tetelek), a watermark se pomiče
+                   nakon svakog zapisanog dana. Ako od zadnjeg exporta nema
+                   novih slogova, baca se NoNewData (pozivatelj briše datoteku)
+    
+    Vraća:
+        int (broj zapisanih bajtova, prije kompresije)
+    """
+    total_valto = 0
+    total_kozonseges = 0
+    metrics = active_metrics
+    write_started = time.perf_counter()
+    
+    boundary_date = None
+    if watermark is not None and watermark.last_date is not None:
+        boundary_date = watermark.last_date
+        start_date = max(start_date, boundary_date)
+    
+    start_str = start_date.strftime('%Y-%m-%d')
+    end_str = end_date.strftime('%Y-%m-%d')
+    
+    # Jedan upit za cijeli raspon - dani bez BLAGAJNA sloga se ne obilaze
+    with metrics_phase(metrics, 'baza'):
+        idblag_index = get_idblag_index(start_str, end_str)
+    
+    # Tečajevi za cijeli raspon, jednom
+    with metrics_phase(metrics, 'tecajevi'):
+        rates = load_rate_index(start_date, end_date)
+    
+    workers = EXPORT_CONFIG['workers']
+    if workers > 1:
+        day_data = iter_day_data_parallel(
+            idblag_index, workers, EXPORT_CONFIG['shard_days'], EXPORT_CONFIG['fetch_size']
+        )
+    else:
+        day_data = iter_day_data(idblag_index, EXPORT_CONFIG['fetch_size'])
+    if metrics is not None:
+        day_data = metrics.timed_iter('baza', day_data)
+    
+    if output_format is None:
+        output_format = EXPORT_CONFIG['output_format']
+    
+    writer = XmlStreamWriter(
+        fp,
+        indent='  ' if output_format == 'indented' else None,
+        text_escaping=EXPORT_CONFIG['text_escaping']
+    )
+    days_total = len(idblag_index)
+    
+    # Konstantni dijelovi stavki se pripremaju jednom po exportu
+    valto_text = str(valto_nbr)
+    amount_text, product_text, percent_rest_text = MONEY_FORMATTERS[EXPORT_CONFIG['money']]
+    if EXPORT_CONFIG['row_formatter'] == 'compiled':
+        format_row = compile_kozonseges_formatter(writer, valto_nbr, amount_text)
+    else:
+        format_row = None
+    
+    for days_done, (datum, stanje_rows, transactions) in enumerate(day_data, start=1):
+        if cancel_event is not None and cancel_event.is_set():
+            raise ExportCancelled()
+        
+        d_datum = datum.strftime('%Y-%m-%d')
+        
+        # Dan na kojem je stao prethodni export: stanja su već poslana,
+        # a od transakcija idu samo one s većim ID_BT
+        boundary_day = datum == boundary_date
+        nbr_counter = 1
+        if boundary_day:
+            transactions = [t for t in transactions if watermark.is_new(datum, t)]
+            stanje_rows = []
+            nbr_counter = watermark.last_date_rows + 1
+        
+        # ═══════════════════════════════════════════════════════════
+        # GRUPA 1: valto_tetelek
+        # ═══════════════════════════════════════════════════════════
+        
+        valto_tetelek = []
+        
+        for stanje in stanje_rows:
+            valuta = stanje.valuta
+            iznos = stanje.iznos
+            prov_za_banku = stanje.prov_za_banku
+            kupovni_tecaj = rates.lookup(valuta, datum)
+            
+            valto_tetelek.append([
+                ('valto_datum', d_datum),
+                ('valto_nbr', valto_text),
+                ('valto_valuta', str(valuta) if valuta else ''),
+                ('valto_nyito', amount_text(iznos)),
+                ('valto_nyito_km', product_text(iznos, kupovni_tecaj)),
+                ('valto_exc_percent', percent_rest_text(prov_za_banku)),
+                ('valto_bank_percent', amount_text(prov_za_banku)),
+            ])
+            
+            total_valto += 1
+        
+        if not boundary_day:
+            writer.write_group('valto_tetelek', 'valto_tetel', valto_tetelek)
+        
+        # ═══════════════════════════════════════════════════════════
+        # GRUPA 2: kozonseges_tetelek
+        # ═══════════════════════════════════════════════════════════
+        
+        kozonseges_tetelek = []
+        
+        for t in transactions:
+            alap_arf_tecaj = rates.lookup(t.valuta, datum)
+            
+            if format_row is not None:
+                kozonseges_tetelek.append(format_row(t, nbr_counter, alap_arf_tecaj))
+            else:
+                kozonseges_tetelek.append(
+                    kozonseges_fields(t, nbr_counter, valto_text, alap_arf_tecaj, amount_text)
+                )
+            
+            nbr_counter += 1
+            total_kozonseges += 1
+        
+        if not boundary_day or kozonseges_tetelek:
+            if format_row is not None:
+                writer.write_rendered_group('kozonseges_tetelek', kozonseges_tetelek)
+            else:
+                writer.write_group('kozonseges_tetelek', 'kozonseges_tetel', kozonseges_tetelek)
+        
+        if watermark is not None:
+            watermark.advance(datum, transactions)
+        
+        if progress is not None:
+            progress({
+                'day': d_datum,
+                'days_done': days_done,
+                'days_total': days_total,
+                'rows_written': total_valto + total_kozonseges,
+                'bytes_written': writer.bytes_written
+            })
+    
+    if boundary_date is not None and total_valto + total_kozonseges == 0:
+        raise NoNewData(f"Nema novih podataka od zadnjeg exporta ({boundary_date.strftime('%Y-%m-%d')})")
+    
+    writer.close()
+    
+    if metrics is not None:
+        metrics.finish_xml(time.perf_counter() - write_started, total_valto + total_kozonseges,
+                           writer.bytes_written, days_total, total_kozonseges)
+    
+    return writer.bytes_written
+
+
+def _export_watermark(valto_nbr, incremental=None):
+    """
+    Vraća ExportWatermark za export ili None ako se watermark ne vodi.
+    
+    Uz [EXPORT] incremental=1 watermark se vodi uvijek; kod punog re-exporta
+    (incremental=False) kreće od praznog, pa se nakon exporta ipak pomiče.
+    """
+    if incremental is None:
+        incremental = EXPORT_CONFIG['incremental']
+    if incremental:
+        return load_watermark(valto_nbr)
+    if EXPORT_CONFIG['incremental']:
+        return ExportWatermark()
+    return None
+
+
+def generate_xml(valto_nbr, start_date, end_date, progress=None, cancel_event=None, output_dir=None,
+                 output_format=None, compression=None, incremental=None):
+    """
+    Generira XML datoteku iteracijom po danima koji imaju BLAGAJNA slog
+    (write_xml), a datoteka se piše samo jednom.
+    
+    Ne koristi GUI pa se smije pozivati iz radne niti i iz CLI-ja. Pri
+    grešci ili prekidu nepotpuna datoteka se briše, a iznimka se prosljeđuje
+    pozivatelju.
+    
+    Parametri:
+        valto_nbr: string (UNIQUEID iz FIRME)
+        start_date: datetime.date objekt
+        end_date: datetime.date objekt
+        progress: opcionalna funkcija, vidi write_xml
+        cancel_event: opcionalni threading.Event, vidi write_xml
+        output_dir: folder za XML (default XML_FOLDER)
+        output_format: 'indented' ili 'compact' (default [EXPORT] output_format)
+        compression: 'none', 'gzip' ili 'zip' (default [EXPORT] compression)
+        incremental: samo podaci noviji od watermarka (default [EXPORT] incremental);
+                     False = puni re-export raspona. Bez novih podataka baca
+                     NoNewData i datoteka se ne kreira
+    
+    Vraća:
+        string (naziv datoteke, s .gz/.zip nastavkom ako je komprimirana)
+    """
+    if compression is None:
+        compression = EXPORT_CONFIG['compression']
+    profile = begin_export_profile('export')
+    
+    filename = None
+    filepath = None
+    metrics = None
+    try:
+        watermark = _export_watermark(valto_nbr, incremental)
+        
+        xml_name = make_xml_filename(valto_nbr)
+        filename = output_filename(xml_name, compression)
+        metrics = begin_export_metrics('export', filename, valto_nbr, start_date, end_date)
+        
+        xml_folder = output_dir or XML_FOLDER
+        if not os.path.exists(xml_folder):
+            os.makedirs(xml_folder)
+        
+        filepath = os.path.join(xml_folder, filename)
+        
+        with open(filepath, 'wb') as f, compressed_output(f, xml_name, compression) as out:
+            write_xml(out, valto_nbr, start_date, end_date, progress, cancel_event, output_format, watermark)
+        
+        if watermark is not None:
+            save_watermark(valto_nbr, watermark)
+        
+        if metrics is not None:
+            metrics.output_bytes = os.path.getsize(filepath)
+            end_export_metrics(metrics)
+        
+        end_export_profile(profile, filename, output_dir)
+        return filename
+        
+    except BaseException as e:
+        end_export_metrics(metrics, metrics_status(e))
+        end_export_profile(profile, filename, output_dir, metrics_status(e))
+        if filepath and os.path.exists(filepath):
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+        raise
+
+
+# ═══════════════════════════════════════════════════════════
+# FTP UPLOAD
+# ═══════════════════════════════════════════════════════════
+
+def open_ftp():
+    """
+    Otvara FTP vezu i prijavljuje se podacima iz [FTP] sekcije.
+    Vraća: ftplib.FTP objekt (pozivatelj ga zatvara)
+    """
+    ftp = FTP(timeout=FTP_CONFIG['timeout'])
+    try:
+        ftp.connect(FTP_CONFIG['host'], FTP_CONFIG['port'])
+        ftp.login(FTP_CONFIG['user'], FTP_CONFIG['password'])
+    except BaseException:
+        ftp.close()
+        raise
+    return ftp
+
+
+class UploadSizeMismatch(Exception):
+    """Veličina datoteke na serveru ne odgovara lokalnoj nakon slanja."""
+
+
+class UploadFailed(Exception):
+    """
+    export_and_send: XML je u cijelosti zapisan u lokalnu kopiju, ali slanje
+    nije uspjelo. Pozivatelj datoteku (filename) dodaje u red za slanje.
+    """
+    
+    def __init__(self, filename, error):
+        super().__init__(str(error))
+        self.filename = filename
+        self.error = error
+
+
+class FtpUploader:
+    """
+    Jedna prijavljena FTP sesija koja se koristi za više datoteka.
+    
+    Prije svakog slanja sesija se provjerava (NOOP) i po potrebi ponovo
+    otvara. Prekinuti prijenos se nastavlja od veličine koju javlja server
+    (SIZE + REST, a ako server ne podržava REST onda APPE), uz najviše
+    `retries` ponovljenih pokušaja s eksponencijalnim čekanjem
+    (retry_delay, 2 * retry_delay, 4 * retry_delay...). Nakon slanja
+    veličina na serveru mora odgovarati lokalnoj.
+    
+    Greške prijave i prava pristupa (5xx) se ne ponavljaju.
+    """
+    
+    def __init__(self, retries=3, retry_delay=2.0):
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._ftp = None
+        self._lock = threading.Lock()
+    
+    def _session(self):
+        """Vraća živu sesiju, otvara novu ako postojeća ne odgovara."""
+        if self._ftp is not None:
+            try:
+                self._ftp.voidcmd('NOOP')
+                return self._ftp
+            except FTP_ERRORS:
+                self._drop()
+        
+        self._ftp = open_ftp()
+        return self._ftp
+    
+    def _drop(self):
+        """Zatvara sesiju bez QUIT (koristi se nakon greške)."""
+        if self._ftp is not None:
+            try:
+                self._ftp.close()
+            except Exception:
+                pass
+            self._ftp = None
+    
+    @staticmethod
+    def _remote_size(ftp, remote_name):
+        """Vraća veličinu datoteke na serveru ili None (nema datoteke / nema SIZE)."""
+        try:
+            ftp.voidcmd('TYPE I')
+            return ftp.size(remote_name)
+        except error_perm:
+            return None
+    
+    def _send(self, ftp, filepath, remote_name, offset, callback):
+        """Šalje datoteku od offseta: REST + STOR, a ako REST nije podržan APPE."""
+        with open(filepath, 'rb') as file:
+            if offset == 0:
+                ftp.storbinary(f'STOR {remote_name}', file, callback=callback)
+                return
+            
+            file.seek(offset)
+            try:
+                ftp.storbinary(f'STOR {remote_name}', file, callback=callback, rest=offset)
+            except error_perm as e:
+                if not str(e).startswith(('500', '502', '504')):
+                    raise
+                file.seek(offset)
+                ftp.storbinary(f'APPE {remote_name}', file, callback=callback)
+    
+    def upload(self, filepath, remote_name=None, progress=None, cancel_event=None):
+        """
+        Šalje datoteku na FTP server, s nastavkom i ponavljanjem nakon prekida.
+        
+        Parametri:
+            filepath: putanja do lokalne datoteke
+            remote_name: naziv na serveru (default naziv lokalne datoteke)
+            progress: opcionalna funkcija koja se poziva nakon svakog bloka
+                      s dictionaryjem {bytes_sent, bytes_total, attempt}
+            cancel_event: opcionalni threading.Event - provjerava se nakon
+                          svakog bloka i tijekom čekanja između pokušaja
+        
+        Vraća:
+            True
+        
+        Baca:
+            ExportCancelled pri prekidu, UploadSizeMismatch ili FTP grešku
+            kad se potroše svi pokušaji
+        """
+        remote_name = remote_name or os.path.basename(filepath)
+        bytes_total = os.path.getsize(filepath)
+        
+        with self._lock:
+            attempt = 0
+            while True:
+                sent = [0]
+                
+                def on_block(block):
+                    sent[0] += len(block)
+                    if progress is not None:
+                        progress({'bytes_sent': sent[0], 'bytes_total': bytes_total, 'attempt': attempt})
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise ExportCancelled()
+                
+                try:
+                    ftp = self._session()
+                    
+                    # Prvi pokušaj uvijek šalje cijelu datoteku; nakon prekida
+                    # nastavlja od onoga što je server već primio
+                    offset = 0
+                    if attempt > 0:
+                        remote_size = self._remote_size(ftp, remote_name)
+                        if remote_size is not None and remote_size <= bytes_total:
+                            offset = remote_size
+                    sent[0] = offset
+                    
+                    if offset < bytes_total or bytes_total == 0:
+                        self._send(ftp, filepath, remote_name, offset, on_block)
+                    
+                    remote_size = self._remote_size(ftp, remote_name)
+                    if remote_size is not None and remote_size != bytes_total:
+                        raise UploadSizeMismatch(
+                            f"Veličina na serveru ({remote_size} B) ne odgovara "
+                            f"lokalnoj ({bytes_total} B): {remote_name}"
+                        )
+                    return True
+                
+                except ExportCancelled:
+                    self._drop()
+                    raise
+                
+                except error_perm:
+                    raise
+                
+                except (UploadSizeMismatch,) + FTP_ERRORS:
+                    self._drop()
+                    attempt += 1
+                    if attempt > self.retries:
+                        raise
+                    
+                    delay = self.retry_delay * 2 ** (attempt - 1)
+                    if cancel_event is not None:
+                        if cancel_event.wait(delay):
+                            raise ExportCancelled()
+                    else:
+                        time.sleep(delay)
+    
+    def close(self):
+        """Uredno zatvara sesiju (QUIT)."""
+        with self._lock:
+            if self._ftp is not None:
+                try:
+                    self._ftp.quit()
+                except Exception:
+                    pass
+                self._drop()
+
+
+def get_ftp_uploader():
+    """Vraća zajednički FtpUploader (jedna sesija za sve datoteke)."""
+    global ftp_uploader
+    if ftp_uploader is None:
+        ftp_uploader = FtpUploader(FTP_CONFIG['retries'], FTP_CONFIG['retry_delay'])
+    return ftp_uploader
+
+
+def close_ftp_uploader():
+    """Zatvara zajedničku FTP sesiju ako je otvorena."""
+    global ftp_uploader
+    if ftp_uploader is not None:
+        ftp_uploader.close()
+        ftp_uploader = None
+
+
+def upload_to_ftp(filename, progress=None, cancel_event=None, output_dir=None):
+    """
+    Šalje XML datoteku na FTP server preko zajedničke sesije (FtpUploader),
+    s nastavkom prekinutog prijenosa i ponavljanjem.
+    
+    Ne koristi GUI pa se smije pozivati iz radne niti; greške se
+    prosljeđuju pozivatelju kao iznimke.
+    
+    Parametri:
+        filename: string - naziv XML datoteke
+        progress: opcionalna funkcija koja se poziva nakon svakog bloka
+                  s dictionaryjem {bytes_sent, bytes_total, attempt}
+        cancel_event: opcionalni threading.Event - provjerava se nakon
+                      svakog bloka, ako je postavljen baca se ExportCancelled
+        output_dir: folder u kojem je XML (default XML_FOLDER)
+    
+    Vraća:
+        True
+    """
+    xml_folder = output_dir or XML_FOLDER
+    filepath = os.path.join(xml_folder, filename)
+    
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"Datoteka nije pronađena:\n{filepath}")
+    
+    profile = begin_export_profile('upload')
+    metrics = begin_export_metrics('upload', filename)
+    
+    try:
+        with metrics_phase(metrics, 'upload'):
+            result = get_ftp_uploader().upload(filepath, filename, progress, cancel_event)
+    except BaseException as e:
+        end_export_metrics(metrics, metrics_status(e))
+        end_export_profile(profile, filename, output_dir, metrics_status(e))
+        raise
+    
+    if metrics is not None:
+        metrics.upload_bytes = metrics.output_bytes = os.path.getsize(filepath)
+        end_export_metrics(metrics)
+    end_export_profile(profile, filename, output_dir)
+    return result
+
+
+# ═══════════════════════════════════════════════════════════
+# GENERIRANJE I SLANJE U JEDNOM KORAKU
+# ═══════════════════════════════════════════════════════════
+
+class BoundedPipe:
+    """
+    Ograničeni bajtni međuspremnik između niti koja piše XML i niti koja
+    ga šalje na FTP (ftplib.storbinary čita iz njega kao iz datoteke).
+    
+    write() čeka dok u spremniku nema mjesta pa brza ekstrakcija ne može
+    zauzeti neograničeno memorije ako je veza spora. abort() prekida obje
+    strane - čekanja završavaju iznimkom umjesto da vise zauvijek.
+    
+    on_wait(sekunde) se poziva za svako čekanje pisača na mjesto u
+    spremniku (spor FTP), da se to vrijeme ne računa kao pisanje XML-a.
+    """
+    
+    def __init__(self, max_bytes=1024 * 1024, on_wait=None):
+        self.max_bytes = max_bytes
+        self.on_wait = on_wait
+        self._buffer = bytearray()
+        self._closed = False
+        self._error = None
+        self._discard = False
+        self._cond = threading.Condition()
+    
+    def write(self, data):
+        view = memoryview(data)
+        with self._cond:
+            if self._discard:
+                return len(data)
+            while view:
+                while len(self._buffer) >= self.max_bytes and self._error is None:
+                    started = time.perf_counter()
+                    self._cond.wait()
+                    if self.on_wait is not None:
+                        self.on_wait(time.perf_counter() - started)
+                if self._error is not None:
+                    raise self._error
+                n = self.max_bytes - len(self._buffer)
+                self._buffer += view[:n]
+                view = view[n:]
+                self._cond.notify_all()
+        return len(data)
+    
+    def read(self, size=-1):
+        """Vraća do size bajtova, b'' tek kad je pisač zatvorio cijev."""
+        with self._cond:
+            while not self._buffer and not self._closed and self._error is None:
+                self._cond.wait()
+            if self._error is not None:
+                raise self._error
+            if size is None or size < 0:
+                size = len(self._buffer)
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            self._cond.notify_all()
+            return data
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        """Pisač je završio - čitač dobiva ostatak pa b''."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+    
+    def abort(self, error):
+        """Prekida obje strane, čekanja bacaju error."""
+        with self._cond:
+            if self._error is None:
+                self._error = error
+            self._cond.notify_all()
+    
+    def discard(self):
+        """Čitač je odustao - pisač nastavlja, a daljnji write() se odbacuje."""
+        with self._cond:
+            self._discard = True
+            self._buffer.clear()
+            self._cond.notify_all()
+
+
+class TeeWriter:
+    """Prosljeđuje svaki write() na više binarnih file-like objekata."""
+    
+    def __init__(self, *targets):
+        self.targets = targets
+    
+    def write(self, data):
+        for target in self.targets:
+            target.write(data)
+        return len(data)
+    
+    def flush(self):
+        for target in self.targets:
+            target.flush()
+
+
+def export_and_send(valto_nbr, start_date, end_date, progress=None, cancel_event=None,
+                    output_dir=None, keep_local_copy=None, output_format=None, compression=None,
+                    incremental=None):
+    """
+    Generira XML i istovremeno ga šalje na FTP, bez čekanja da datoteka
+    bude gotova na disku.
+    
+    XML se piše u BoundedPipe iz kojeg posebna nit (ftplib.storbinary)
+    šalje podatke dok se kasniji dani još dohvaćaju iz baze, pa je ukupno
+    trajanje približno max(baza, upload) umjesto baza + upload.
+    
+    Ako je keep_local_copy uključen, isti bajtovi se paralelno zapisuju i u
+    lokalnu datoteku (TeeWriter). Ako tada ne uspije samo slanje (FTP je
+    nedostupan ili veza pukne), XML se dovršava u lokalnu datoteku i baca se
+    UploadFailed - pozivatelj datoteku dodaje u red za slanje. Pri grešci
+    exporta ili prekidu lokalna datoteka se briše, a nepotpuna datoteka na
+    FTP serveru se pokušava obrisati.
+    
+    Parametri:
+        valto_nbr: string (UNIQUEID iz FIRME)
+        start_date: datetime.date objekt
+        end_date: datetime.date objekt
+        progress: opcionalna funkcija, vidi write_xml
+        cancel_event: opcionalni threading.Event, vidi write_xml
+        output_dir: folder za lokalnu kopiju (default XML_FOLDER)
+        keep_local_copy: spremi i lokalnu kopiju (default [EXPORT] keep_local_copy)
+        output_format: 'indented' ili 'compact' (default [EXPORT] output_format)
+        compression: 'none', 'gzip' ili 'zip' (default [EXPORT] compression)
+        incremental: vidi generate_xml; watermark se sprema tek nakon uspješnog slanja,
+                     a kod NoNewData se započeta datoteka briše i lokalno i na FTP-u
+    
+    Vraća:
+        string (naziv datoteke)
+    
+    Baca:
+        UploadFailed ako je lokalna kopija gotova, a slanje nije uspjelo
+    """
+    if keep_local_copy is None:
+        keep_local_copy = EXPORT_CONFIG['keep_local_copy']
+    if compression is None:
+        compression = EXPORT_CONFIG['compression']
+    watermark = _export_watermark(valto_nbr, incremental)
+    
+    xml_name = make_xml_filename(valto_nbr)
+    filename = output_filename(xml_name, compression)
+    filepath = None
+    local_file = None
+    upload_error = []
+    
+    try:
+        ftp = open_ftp()
+    except FTP_ERRORS as e:
+        if not keep_local_copy:
+            raise
+        ftp = None
+        upload_error.append(e)
+    
+    profile = begin_export_profile('export_send')
+    metrics = begin_export_metrics('export_send', filename, valto_nbr, start_date, end_date)
+    pipe = BoundedPipe(on_wait=None if metrics is None else lambda seconds: metrics.add_time('cekanje_ftp', seconds))
+    
+    def count_block(block):
+        metrics.upload_bytes += len(block)
+    
+    def upload():
+        try:
+            if metrics is None:
+                ftp.storbinary(f'STOR {filename}', pipe)
+            else:
+                with metrics.phase('upload'):
+                    ftp.storbinary(f'STOR {filename}', pipe, callback=count_block)
+        except BaseException as e:
+            upload_error.append(e)
+            if keep_local_copy:
+                pipe.discard()
+            else:
+                pipe.abort(e)
+    
+    uploader = threading.Thread(target=upload, name='ftp-upload', daemon=True)
+    
+    try:
+        if keep_local_copy:
+            xml_folder = output_dir or XML_FOLDER
+            if not os.path.exists(xml_folder):
+                os.makedirs(xml_folder)
+            filepath = os.path.join(xml_folder, filename)
+            local_file = open(filepath, 'wb')
+            target = local_file if ftp is None else TeeWriter(pipe, local_file)
+        else:
+            target = pipe
+        
+        if ftp is not None:
+            uploader.start()
+        
+        with compressed_output(target, xml_name, compression) as out:
+            write_xml(out, valto_nbr, start_date, end_date, progress, cancel_event, output_format, watermark)
+        pipe.close()
+        if ftp is not None:
+            uploader.join()
+        
+        if local_file is not None:
+            local_file.close()
+        
+        if upload_error and not keep_local_copy:
+            raise upload_error[0]
+        
+        # Podaci su u lokalnoj datoteci koja ide u red za slanje, pa se
+        # watermark sprema i kad slanje nije uspjelo
+        if watermark is not None:
+            save_watermark(valto_nbr, watermark)
+        
+        if upload_error:
+            if ftp is not None:
+                try:
+                    ftp.delete(filename)
+                except Exception:
+                    pass
+            end_export_metrics(metrics, metrics_status(upload_error[0]))
+            end_export_profile(profile, filename, output_dir, metrics_status(upload_error[0]))
+            raise UploadFailed(filename, upload_error[0])
+        
+        ftp.quit()
+        if metrics is not None:
+            metrics.output_bytes = metrics.upload_bytes
+            end_export_metrics(metrics)
+        end_export_profile(profile, filename, output_dir)
+        return filename
+    
+    except UploadFailed:
+        raise
+    
+    except BaseException as e:
+        end_export_metrics(metrics, metrics_status(e))
+        end_export_profile(profile, filename, output_dir, metrics_status(e))
+        pipe.abort(e if isinstance(e, Exception) else ExportCancelled())
+        if uploader.is_alive():
+            uploader.join(timeout=30)
+        
+        if ftp is not None:
+            try:
+                ftp.delete(filename)
+            except Exception:
+                pass
+        
+        if local_file is not None:
+            local_file.close()
+        if filepath and os.path.exists(filepath):
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+        raise
+    
+    finally:
+        if ftp is not None:
+            ftp.close()
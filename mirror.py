@@ -0,0 +1,261 @@
+"""
+Lokalna SQLite kopija (mirror) tablica potrebnih za export.
+
+sync_mirror() kopira iz Firebird baze samo stupce i slogove koje export
+koristi: FIRME, VALUTE i KORISNICI cijele, a BLAGAJNA, BLAGAJNA_STANJE,
+TECAJEVI (RED) i BLAGAJNICKE_TRANSAKCIJE od zadnjeg kopiranog dana nadalje.
+Zadnji dan se uvijek kopira ponovo jer se tijekom dana još mijenja.
+
+Uz [EXPORT] source=mirror exporter.py čita iz mirrora umjesto iz produkcijske
+baze, pa ponovljeni i povijesni exporti ne opterećuju blagajne.
+
+Tipovi stupaca se u mirroru deklariraju prema tipu koji vraća fdb, a
+vrijednosti se vraćaju kao isti Python tipovi (Decimal, date, datetime), pa
+je XML iz mirrora isti kao XML iz Firebird baze.
+"""
+
+import os
+import re
+import sqlite3
+from datetime import date, datetime, time
+from decimal import Decimal
+
+# Registrirani tipovi: NUMERIC/DECIMAL se čuva kao tekst da Decimal zadrži
+# točan zapis (npr. '1.234500'), datumi kao ISO tekst
+sqlite3.register_converter('DECIMAL_TEXT', lambda b: Decimal(b.decode()))
+sqlite3.register_converter('FB_DATE', lambda b: date.fromisoformat(b.decode()))
+sqlite3.register_converter('FB_TIMESTAMP', lambda b: datetime.fromisoformat(b.decode()))
+sqlite3.register_converter('FB_TIME', lambda b: time.fromisoformat(b.decode()))
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(time, time.isoformat)
+
+# Python tip iz fdb -> deklarirani tip u SQLite (datetime prije date jer je podklasa)
+MIRROR_TYPES = (
+    (bool, 'INTEGER'),
+    (int, 'INTEGER'),
+    (float, 'REAL'),
+    (Decimal, 'DECIMAL_TEXT'),
+    (datetime, 'FB_TIMESTAMP'),
+    (date, 'FB_DATE'),
+    (time, 'FB_TIME'),
+    (str, 'TEXT'),
+    (bytes, 'BLOB'),
+)
+
+# Tablice koje se kopiraju cijele (male šifrarnike)
+FULL_TABLES = (
+    ('FIRME', 'SELECT IDFIRME, UNIQUEID FROM FIRME'),
+    ('VALUTE', 'SELECT VALUTA_BROJCANO, PROV_ZA_BANKU, PROVBANKE FROM VALUTE'),
+    ('KORISNICI', 'SELECT IDKOR, IME FROM KORISNICI'),
+)
+
+# Tablice koje se kopiraju od datuma: (tablica, upit na Firebird, brisanje u mirroru)
+DATED_TABLES = (
+    (
+        'BLAGAJNA',
+        '''
+            SELECT IDBLAG, TL_DATUM_TECAJNE_LISTE
+            FROM BLAGAJNA
+            WHERE TL_DATUM_TECAJNE_LISTE >= ?
+        ''',
+        'DELETE FROM BLAGAJNA WHERE TL_DATUM_TECAJNE_LISTE >= ?'
+    ),
+    (
+        'BLAGAJNA_STANJE',
+        '''
+            SELECT bs.IDBLAG, bs.VALUTA_BROJCANO, bs.IZNOS
+            FROM BLAGAJNA_STANJE bs
+            JOIN BLAGAJNA b ON bs.IDBLAG = b.IDBLAG
+            WHERE b.TL_DATUM_TECAJNE_LISTE >= ?
+        ''',
+        '''
+            DELETE FROM BLAGAJNA_STANJE WHERE IDBLAG IN
+                (SELECT IDBLAG FROM BLAGAJNA WHERE TL_DATUM_TECAJNE_LISTE >= ?)
+        '''
+    ),
+    (
+        'TECAJEVI',
+        '''
+            SELECT TL_DATUM_TECAJNE_LISTE, VMT_VRSTA_TECAJA, VALUTA_BROJCANO, KUPOVNI_TECAJ
+            FROM TECAJEVI
+            WHERE TL_DATUM_TECAJNE_LISTE >= ?
+              AND VMT_VRSTA_TECAJA = 'RED'
+        ''',
+        'DELETE FROM TECAJEVI WHERE TL_DATUM_TECAJNE_LISTE >= ?'
+    ),
+    (
+        'BLAGAJNICKE_TRANSAKCIJE',
+        '''
+            SELECT
+                bt.ID_BT,
+                bt.IDBLAG,
+                bt.TEC_TL_DATUM_TECAJNE_LISTE,
+                bt.TEC_VALUTA_BROJCANO,
+                bt.IZNOS_U_VALUTI,
+                bt.IZNOS_U_KUNAMA,
+                bt.DATUM_I_VRIJEME_TRANSAKCIJE,
+                bt.SERIJSKI_BROJ,
+                bt.BR_KARTICE,
+                bt.OZNAKA_PLATNOG_INSTRUMENTA_U_K,
+                bt.PRIMJENJENI_TECAJ,
+                bt.PRODAOIME,
+                bt.PRODAODOK,
+                bt.SISUSER
+            FROM BLAGAJNICKE_TRANSAKCIJE bt
+            JOIN BLAGAJNA b ON bt.IDBLAG = b.IDBLAG
+            WHERE b.TL_DATUM_TECAJNE_LISTE >= ?
+        ''',
+        '''
+            DELETE FROM BLAGAJNICKE_TRANSAKCIJE WHERE IDBLAG IN
+                (SELECT IDBLAG FROM BLAGAJNA WHERE TL_DATUM_TECAJNE_LISTE >= ?)
+        '''
+    ),
+)
+
+# Indeksi za upite iz exporter.py
+MIRROR_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS IX_BLAGAJNA_DATUM ON BLAGAJNA (TL_DATUM_TECAJNE_LISTE, IDBLAG)',
+    'CREATE INDEX IF NOT EXISTS IX_BLAGAJNA_STANJE_IDBLAG ON BLAGAJNA_STANJE (IDBLAG)',
+    'CREATE INDEX IF NOT EXISTS IX_TECAJEVI_DATUM ON TECAJEVI (TL_DATUM_TECAJNE_LISTE, VMT_VRSTA_TECAJA)',
+    'CREATE INDEX IF NOT EXISTS IX_BT_IDBLAG ON BLAGAJNICKE_TRANSAKCIJE (IDBLAG, ID_BT)',
+)
+
+BATCH_SIZE = 1000
+
+
+def open_mirror_connection(path):
+    """
+    Otvara SQLite mirror tako da vraća iste Python tipove kao fdb.
+    Konekcija se smije koristiti iz radne niti (check_same_thread=False).
+    Vraća: sqlite3.Connection objekt
+    """
+    con = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+    con.execute('PRAGMA journal_mode=WAL')
+    return con
+
+
+def translate_sql(sql):
+    """Prevodi Firebird SQL u SQLite: SELECT FIRST n ... -> SELECT ... LIMIT n."""
+    match = re.match(r'\s*SELECT\s+FIRST\s+(\d+)\s+', sql, re.IGNORECASE)
+    if match is None:
+        return sql
+    return f"SELECT {sql[match.end():].rstrip().rstrip(';')} LIMIT {match.group(1)}"
+
+
+def _column_types(description, rows):
+    """
+    Vraća deklarirane SQLite tipove stupaca.
+    Tip se uzima iz cursor.description (fdb daje Python tip), a ako ga nema
+    iz prve vrijednosti koja nije None.
+    """
+    types = []
+    for i, column in enumerate(description):
+        python_type = column[1] if isinstance(column[1], type) else None
+        if python_type is None:
+            python_type = next((type(row[i]) for row in rows if row[i] is not None), str)
+        types.append(next(
+            (sql_type for candidate, sql_type in MIRROR_TYPES if issubclass(python_type, candidate)),
+            'TEXT'
+        ))
+    return types
+
+
+def _copy(source_con, mirror_con, table, sql, params=()):
+    """
+    Kopira rezultat upita u tablicu mirrora (kreira je ako ne postoji).
+    Vraća: broj kopiranih slogova
+    """
+    cur = source_con.cursor()
+    cur.execute(sql, params)
+    rows = cur.fetchmany(BATCH_SIZE)
+    
+    columns = [column[0] for column in cur.description]
+    column_defs = ', '.join(
+        f'{name} {sql_type}' for name, sql_type in zip(columns, _column_types(cur.description, rows))
+    )
+    mirror_con.execute(f'CREATE TABLE IF NOT EXISTS {table} ({column_defs})')
+    
+    insert = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    copied = 0
+    while rows:
+        mirror_con.executemany(insert, rows)
+        copied += len(rows)
+        rows = cur.fetchmany(BATCH_SIZE)
+    
+    return copied
+
+
+def get_mirror_last_date(mirror_con):
+    """Vraća zadnji datum iz BLAGAJNA u mirroru ili None ako je mirror prazan."""
+    try:
+        row = mirror_con.execute('SELECT MAX(TL_DATUM_TECAJNE_LISTE) FROM BLAGAJNA').fetchone()
+    except sqlite3.OperationalError:
+        return None
+    if not row or row[0] is None:
+        return None
+    value = row[0]
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def sync_mirror(source_con, mirror_path, since=None, progress=None):
+    """
+    Osvježava SQLite mirror iz Firebird baze.
+    
+    Šifrarnici se kopiraju cijeli, a tablice po danima od zadnjeg dana u
+    mirroru (uključivo) nadalje. Kod prvog kopiranja kreće od since (ili od
+    početka ako since nije zadan). Sve se radi u jednoj SQLite transakciji,
+    pa export iz mirrora nikad ne vidi napola kopirane podatke.
+    
+    Parametri:
+        source_con: otvorena fdb konekcija
+        mirror_path: putanja do SQLite datoteke (kreira se ako ne postoji)
+        since: opcionalni datetime.date za prvo kopiranje
+        progress: opcionalna funkcija (tablica, broj slogova) nakon svake tablice
+    
+    Vraća:
+        dictionary {tablica: broj kopiranih slogova}
+    """
+    folder = os.path.dirname(os.path.abspath(mirror_path))
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    
+    mirror_con = open_mirror_connection(mirror_path)
+    counts = {}
+    try:
+        from_date = get_mirror_last_date(mirror_con) or since or date(1900, 1, 1)
+        
+        # Eksplicitna transakcija - i DROP/CREATE šifrarnika je u njoj, pa
+        # export koji istovremeno čita mirror vidi ili staro ili novo stanje
+        mirror_con.execute('BEGIN IMMEDIATE')
+        try:
+            for table, sql in FULL_TABLES:
+                mirror_con.execute(f'DROP TABLE IF EXISTS {table}')
+                counts[table] = _copy(source_con, mirror_con, table, sql)
+                if progress is not None:
+                    progress(table, counts[table])
+            
+            # Ovisne tablice se brišu prije BLAGAJNA jer brisanje ide preko nje
+            for table, sql, delete_sql in reversed(DATED_TABLES):
+                try:
+                    mirror_con.execute(delete_sql, (from_date,))
+                except sqlite3.OperationalError:
+                    pass  # tablica još ne postoji (prvo kopiranje)
+            
+            for table, sql, delete_sql in DATED_TABLES:
+                counts[table] = _copy(source_con, mirror_con, table, sql, (from_date,))
+                if progress is not None:
+                    progress(table, counts[table])
+            
+            for sql in MIRROR_INDEXES:
+                mirror_con.execute(sql)
+            
+            mirror_con.commit()
+        except BaseException:
+            mirror_con.rollback()
+            raise
+    finally:
+        mirror_con.close()
+    
+    return counts
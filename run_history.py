@@ -0,0 +1,190 @@
+"""
+Povijest exporta u lokalnoj SQLite bazi (run_history.sqlite).
+
+Uz [EXPORT] history=1 svaki export i slanje dopisuje jedan slog s
+mjerenjima (exporter.ExportMetrics): raspon datuma, broj dana s podacima i
+transakcija, trajanje po fazama, veličinu datoteke, trajanje slanja i
+verziju aplikacije.
+
+find_regressions() za svaki uspješni export uspoređuje slogova/s s
+pomičnim medijanom prethodnih exporta iste poslovnice i operacije
+(valto_nbr, operation) i označava
+exporte koji su znatno sporiji - npr. nakon gubitka indeksa ili rasta
+EXCHANGE-*.FDB baze. Izvještaj ispisuje cli.py --history.
+"""
+
+import os
+import sqlite3
+import statistics
+
+# Stupci tablice runs, redom (id je INTEGER PRIMARY KEY)
+HISTORY_COLUMNS = (
+    ('started_at', 'TEXT'),
+    ('app_version', 'TEXT'),
+    ('operation', 'TEXT'),
+    ('status', 'TEXT'),
+    ('valto_nbr', 'TEXT'),
+    ('source', 'TEXT'),
+    ('filename', 'TEXT'),
+    ('start_date', 'TEXT'),
+    ('end_date', 'TEXT'),
+    ('days', 'INTEGER'),
+    ('transactions', 'INTEGER'),
+    ('rows_written', 'INTEGER'),
+    ('total_seconds', 'REAL'),
+    ('baza_seconds', 'REAL'),
+    ('tecajevi_seconds', 'REAL'),
+    ('xml_seconds', 'REAL'),
+    ('upload_seconds', 'REAL'),
+    ('queries', 'INTEGER'),
+    ('rows_fetched', 'INTEGER'),
+    ('sql_seconds', 'REAL'),
+    ('xml_bytes', 'INTEGER'),
+    ('output_bytes', 'INTEGER'),
+    ('upload_bytes', 'INTEGER'),
+)
+
+# Operacije koje pišu XML (upload samo šalje postojeću datoteku)
+EXPORT_OPERATIONS = ('export', 'export_send')
+
+# Broj prethodnih exporta za pomični medijan i najmanji broj za usporedbu
+ROLLING_WINDOW = 10
+MIN_HISTORY = 3
+
+# Export je sumnjiv ako je brzina ispod ovog udjela medijana
+DEFAULT_THRESHOLD = 0.5
+
+
+def open_history(path):
+    """
+    Otvara (i po potrebi kreira) bazu povijesti exporta.
+    Vraća: sqlite3.Connection objekt
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    
+    con = sqlite3.connect(path)
+    con.row_factory = sqlite3.Row
+    column_defs = ', '.join(f'{name} {sql_type}' for name, sql_type in HISTORY_COLUMNS)
+    con.execute(f'CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, {column_defs})')
+    con.execute('CREATE INDEX IF NOT EXISTS IX_RUNS_VALTO ON runs (valto_nbr, started_at)')
+    return con
+
+
+def record_run(path, metrics, app_version, source):
+    """
+    Dopisuje mjerenje jednog exporta ili slanja u povijest.
+    
+    Parametri:
+        path: putanja do baze povijesti
+        metrics: exporter.ExportMetrics (nakon end_export_metrics)
+        app_version: verzija aplikacije (config.APP_VERSION)
+        source: izvor podataka (putanja do .FDB baze ili mirrora)
+    """
+    values = {
+        'started_at': metrics.started_at.isoformat(' ', 'seconds'),
+        'app_version': app_version,
+        'operation': metrics.operation,
+        'status': metrics.status,
+        'valto_nbr': metrics.valto_nbr,
+        'source': source,
+        'filename': metrics.filename,
+        'start_date': metrics.start_date.isoformat() if metrics.start_date else None,
+        'end_date': metrics.end_date.isoformat() if metrics.end_date else None,
+        'days': metrics.days,
+        'transactions': metrics.transactions,
+        'rows_written': metrics.rows_written,
+        'total_seconds': metrics.total_seconds,
+        'baza_seconds': metrics.phases.get('baza'),
+        'tecajevi_seconds': metrics.phases.get('tecajevi'),
+        'xml_seconds': metrics.phases.get('xml'),
+        'upload_seconds': metrics.phases.get('upload'),
+        'queries': metrics.queries,
+        'rows_fetched': metrics.rows_fetched,
+        'sql_seconds': metrics.sql_seconds,
+        'xml_bytes': metrics.bytes_written,
+        'output_bytes': metrics.output_bytes,
+        'upload_bytes': metrics.upload_bytes,
+    }
+    columns = [name for name, sql_type in HISTORY_COLUMNS]
+    
+    con = open_history(path)
+    try:
+        con.execute(
+            f"INSERT INTO runs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [values[name] for name in columns]
+        )
+        con.commit()
+    finally:
+        con.close()
+
+
+def load_runs(path, valto_nbr=None):
+    """
+    Vraća sve slogove povijesti redom po vremenu (starije prvo).
+    
+    Parametri:
+        path: putanja do baze povijesti
+        valto_nbr: opcionalno samo jedna poslovnica
+    
+    Vraća:
+        lista sqlite3.Row (pristup po nazivu stupca), [] ako baze nema
+    """
+    if not os.path.exists(path):
+        return []
+    
+    con = open_history(path)
+    try:
+        if valto_nbr is None:
+            return con.execute('SELECT * FROM runs ORDER BY started_at, id').fetchall()
+        return con.execute(
+            'SELECT * FROM runs WHERE valto_nbr = ? ORDER BY started_at, id', (valto_nbr,)
+        ).fetchall()
+    finally:
+        con.close()
+
+
+def rows_per_second(run):
+    """
+    Slogova u sekundi za export: zapisani slogovi kroz vrijeme pisanja XML-a
+    (baza + tečajevi + XML). Kod export_send čekanje na FTP (puni
+    BoundedPipe) nije u xml_seconds, pa spor FTP ne smanjuje brzinu.
+    Vraća None za slanja, neuspjele exporte i exporte bez slogova.
+    """
+    if run['operation'] not in EXPORT_OPERATIONS or run['status'] != 'ok' or not run['rows_written']:
+        return None
+    seconds = sum(run[column] or 0.0 for column in ('baza_seconds', 'tecajevi_seconds', 'xml_seconds'))
+    if seconds <= 0:
+        return None
+    return run['rows_written'] / seconds
+
+
+def find_regressions(runs, threshold=DEFAULT_THRESHOLD, window=ROLLING_WINDOW):
+    """
+    Uspoređuje svaki export s pomičnim medijanom prethodnih exporta iste
+    poslovnice i iste operacije (export i export_send se ne miješaju).
+    
+    Parametri:
+        runs: slogovi iz load_runs (redom po vremenu)
+        threshold: export je označen ako je slogova/s < threshold * medijan
+        window: broj prethodnih exporta za medijan
+    
+    Vraća:
+        lista (run, slogova/s, medijan ili None, označen) za svaki slog iz runs
+    """
+    previous = {}
+    results = []
+    
+    for run in runs:
+        speed = rows_per_second(run)
+        history = previous.setdefault((run['valto_nbr'], run['operation']), [])
+        
+        median = statistics.median(history[-window:]) if len(history) >= MIN_HISTORY else None
+        flagged = speed is not None and median is not None and speed < threshold * median
+        results.append((run, speed, median, flagged))
+        
+        if speed is not None:
+            history.append(speed)
+    
+    return results
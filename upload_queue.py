@@ -0,0 +1,250 @@
+"""
+Trajni red za slanje XML datoteka na FTP.
+
+Red se čuva u manifestu (upload_queue.json) u folderu s XML datotekama, pa
+neposlane datoteke ostaju u redu i nakon ponovnog pokretanja aplikacije.
+Pozadinske niti šalju datoteke redom kojim su dodane, najviše
+[FTP] queue_workers istovremeno; svaka nit ima svoju FTP sesiju
+(exporter.FtpUploader).
+
+Ako slanje ne uspije ni nakon ponovljenih pokušaja (FTP je nedostupan),
+datoteka se premješta na kraj reda, a red čeka [FTP] queue_retry_interval
+sekundi prije sljedećeg pokušaja - jedna neuspjela datoteka ne blokira
+ostale. Datoteke koje server trajno odbija (5xx osim 530 prijave, npr. 550 /
+553) se odlažu: ostaju u manifestu s greškom, ali se ne šalju ponovo dok se
+ne dodaju u red iznova (enqueue).
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from ftplib import error_perm
+
+import exporter
+from exporter import ExportCancelled, FtpUploader
+
+MANIFEST_FILE = 'upload_queue.json'
+
+
+def is_rejected(error):
+    """
+    True ako je server trajno odbio datoteku (5xx). Neuspjela prijava (530)
+    vrijedi za sve datoteke, pa se tretira kao nedostupan FTP.
+    """
+    return isinstance(error, error_perm) and not str(error).startswith('530')
+
+
+class UploadQueue:
+    """
+    Red datoteka za slanje s manifestom na disku.
+    
+    on_event se poziva iz pozadinskih niti s (vrsta, podatak):
+        ('queue_sent', filename)
+        ('queue_error', (filename, greška))
+        ('queue_rejected', (filename, greška)) - datoteka je odložena
+        ('queue_changed', broj datoteka u redu)
+    """
+    
+    def __init__(self, folder=None, workers=1, retry_interval=60, on_event=None):
+        self.folder = folder or exporter.XML_FOLDER
+        self.workers = max(1, workers)
+        self.retry_interval = retry_interval
+        self.on_event = on_event
+        self.manifest_path = os.path.join(self.folder, MANIFEST_FILE)
+        
+        self._entries = self._load()
+        self._in_flight = set()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+    
+    def _load(self):
+        """
+        Učitava manifest; ako ne postoji, red je prazan.
+        Oštećeni manifest se preimenuje u .bad da ne blokira pokretanje.
+        """
+        if not os.path.exists(self.manifest_path):
+            return []
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('pending', [])
+        except ValueError:
+            os.replace(self.manifest_path, self.manifest_path + '.bad')
+            return []
+    
+    def _save(self):
+        """Zapisuje manifest atomarno (tmp datoteka + os.replace). Poziva se pod self._cond."""
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'pending': self._entries}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+    
+    def _emit(self, kind, payload):
+        if self.on_event is not None:
+            self.on_event(kind, payload)
+    
+    def enqueue(self, filename):
+        """
+        Dodaje datoteku na kraj reda (ako već nije u redu). Odložena datoteka
+        se vraća u red.
+        """
+        with self._cond:
+            for entry in self._entries:
+                if entry['filename'] == filename:
+                    if not entry.get('rejected'):
+                        return
+                    self._entries.remove(entry)
+                    break
+            self._entries.append({
+                'filename': filename,
+                'queued_at': datetime.now().isoformat(timespec='seconds'),
+                'attempts': 0,
+                'last_error': None
+            })
+            self._save()
+            count = sum(1 for e in self._entries if not e.get('rejected'))
+            self._cond.notify_all()
+        self._emit('queue_changed', count)
+    
+    def pending(self):
+        """Vraća listu naziva datoteka koje čekaju slanje, redom (bez odloženih)."""
+        with self._cond:
+            return [entry['filename'] for entry in self._entries if not entry.get('rejected')]
+    
+    def rejected(self):
+        """Vraća listu (naziv, greška) datoteka koje je server odbio."""
+        with self._cond:
+            return [(entry['filename'], entry['last_error']) for entry in self._entries if entry.get('rejected')]
+    
+    def start(self):
+        """Pokreće pozadinske niti za slanje."""
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'upload-queue-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self, timeout=10):
+        """
+        Zaustavlja niti. Slanje u tijeku se prekida, a datoteka ostaje u
+        redu i nastavlja se pri sljedećem pokretanju.
+        """
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+    
+    def drain(self):
+        """
+        Šalje sve datoteke iz reda redom u pozivajućoj niti, staje na prvoj
+        grešci (za cli.py / zakazane zadatke). Datoteke koje server odbije se
+        odlažu i slanje se nastavlja.
+        
+        Vraća:
+            (broj poslanih, broj preostalih u redu)
+        """
+        uploader = FtpUploader(exporter.FTP_CONFIG['retries'], exporter.FTP_CONFIG['retry_delay'])
+        sent = 0
+        try:
+            while True:
+                entry = self._take()
+                if entry is None:
+                    break
+                if self._send(uploader, entry):
+                    sent += 1
+                elif not entry.get('rejected'):
+                    break
+        finally:
+            uploader.close()
+        return sent, len(self.pending())
+    
+    def _take(self, wait=False):
+        """
+        Vraća prvu datoteku koja se ne šalje u drugoj niti (ili None).
+        Uz wait=True čeka novu datoteku, odnosno kraj pauze nakon greške.
+        """
+        with self._cond:
+            while True:
+                if self._stop.is_set():
+                    return None
+                
+                paused = self._paused_until - time.monotonic()
+                if wait and paused > 0:
+                    self._cond.wait(paused)
+                    continue
+                
+                for entry in self._entries:
+                    if entry['filename'] not in self._in_flight and not entry.get('rejected'):
+                        self._in_flight.add(entry['filename'])
+                        return entry
+                if not wait:
+                    return None
+                self._cond.wait()
+    
+    def _finish(self, entry, error=None):
+        """
+        Uklanja poslanu datoteku iz reda ili bilježi grešku: odbijena
+        datoteka se odlaže, a ostale idu na kraj reda.
+        """
+        with self._cond:
+            self._in_flight.discard(entry['filename'])
+            self._entries = [e for e in self._entries if e['filename'] != entry['filename']]
+            if error is not None:
+                entry['attempts'] += 1
+                entry['last_error'] = str(error)
+                self._entries.append(entry)
+                if is_rejected(error):
+                    entry['rejected'] = True
+                else:
+                    # FTP nedostupan - cijeli red čeka prije sljedećeg pokušaja
+                    self._paused_until = time.monotonic() + self.retry_interval
+            self._save()
+            count = sum(1 for e in self._entries if not e.get('rejected'))
+            self._cond.notify_all()
+        self._emit('queue_changed', count)
+    
+    def _send(self, uploader, entry):
+        """
+        Šalje jednu datoteku.
+        Vraća: True ako je poslana (ili je više nema na disku), False pri grešci
+        """
+        filename = entry['filename']
+        filepath = os.path.join(self.folder, filename)
+        
+        if not os.path.exists(filepath):
+            self._finish(entry)
+            self._emit('queue_error', (filename, FileNotFoundError(f"Datoteka nije pronađena:\n{filepath}")))
+            return True
+        
+        try:
+            uploader.upload(filepath, filename, cancel_event=self._stop)
+        except ExportCancelled:
+            with self._cond:
+                self._in_flight.discard(filename)
+            return False
+        except Exception as e:
+            self._finish(entry, e)
+            self._emit('queue_rejected' if entry.get('rejected') else 'queue_error', (filename, e))
+            return False
+        
+        self._finish(entry)
+        self._emit('queue_sent', filename)
+        return True
+    
+    def _worker(self):
+        uploader = FtpUploader(exporter.FTP_CONFIG['retries'], exporter.FTP_CONFIG['retry_delay'])
+        try:
+            while not self._stop.is_set():
+                entry = self._take(wait=True)
+                if entry is None:
+                    break
+                self._send(uploader, entry)
+        finally:
+            uploader.close()